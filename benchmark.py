@@ -0,0 +1,1124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Замеры производительности извлечения email адресов.
+
+Примеры:
+    python benchmark.py parallel --files 200 --workers 4
+    python benchmark.py fragments --rows 100000
+    python benchmark.py matching --megabytes 20
+    python benchmark.py ooxml --files 40
+    python benchmark.py prefetch --files 100 --latency 20
+    python benchmark.py pdfpages --pages 400 --files 4 --workers 4
+    python benchmark.py formats
+    python benchmark.py suite --files 100 --save-baseline baseline.json
+    python benchmark.py suite --files 100 --baseline baseline.json
+    python benchmark.py startup
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import struct
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import find_emails
+from find_emails import EmailExtractor
+
+try:
+    from docx import Document
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+try:
+    from pptx import Presentation
+    PPTX_AVAILABLE = True
+except ImportError:
+    PPTX_AVAILABLE = False
+
+
+WORDS = (
+    "договор поставка счет оплата акт отчет проект встреча клиент менеджер "
+    "contract invoice delivery payment report meeting project manager client"
+).split()
+
+
+def random_email(rng):
+    """Сгенерировать случайный email адрес."""
+    user = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10)))
+    domain = rng.choice(['example.com', 'mail.ru', 'company.org', 'test.net'])
+    return f"{user}@{domain}"
+
+
+def random_paragraph(rng, words=40, email_rate=0.05):
+    """Сгенерировать абзац текста, в котором иногда встречаются email адреса."""
+    parts = []
+    for _ in range(words):
+        if rng.random() < email_rate:
+            parts.append(random_email(rng))
+        else:
+            parts.append(rng.choice(WORDS))
+    return ' '.join(parts)
+
+
+def generate_corpus(directory, files, seed=0):
+    """
+    Создать синтетический набор документов.
+
+    Args:
+        directory: Папка для файлов
+        files: Количество файлов
+        seed: Зерно генератора случайных чисел
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    kinds = ['txt']
+    if DOCX_AVAILABLE:
+        kinds.append('docx')
+    if find_emails.XLSX_AVAILABLE:
+        kinds.append('xlsx')
+
+    for i in range(files):
+        kind = kinds[i % len(kinds)]
+        path = directory / f"{i // 50:03d}" / f"doc_{i:05d}.{kind}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        if kind == 'txt':
+            path.write_text('\n'.join(random_paragraph(rng) for _ in range(200)), encoding='utf-8')
+        elif kind == 'docx':
+            document = Document()
+            for _ in range(100):
+                document.add_paragraph(random_paragraph(rng))
+            document.save(path)
+        elif kind == 'xlsx':
+            workbook = find_emails.openpyxl.Workbook()
+            sheet = workbook.active
+            for _ in range(300):
+                sheet.append([random_paragraph(rng, words=5) for _ in range(5)])
+            workbook.save(path)
+
+
+def timed_run(directory, workers):
+    """Обработать папку и вернуть (время, экстрактор)."""
+    extractor = EmailExtractor(workers=workers)
+    started = time.perf_counter()
+    extractor.process_directory(directory)
+    return time.perf_counter() - started, extractor
+
+
+def same_results(first, second):
+    """Проверить, что два прогона нашли одни и те же email в одних и тех же файлах."""
+    def normalized(extractor):
+        return {email: sorted(files) for email, files in extractor.found_emails.items()}
+    return normalized(first) == normalized(second)
+
+
+def bench_parallel(args):
+    """Сравнить последовательную и параллельную обработку."""
+    with tempfile.TemporaryDirectory() as directory:
+        generate_corpus(directory, args.files, args.seed)
+
+        serial_time, serial = timed_run(directory, 1)
+        parallel_time, parallel = timed_run(directory, args.workers)
+
+        print(f"Файлов: {args.files}, процессов: {args.workers}, ядер: {os.cpu_count()}")
+        print(f"Последовательно: {serial_time:.2f} с")
+        print(f"Параллельно:     {parallel_time:.2f} с")
+        print(f"Ускорение:       {serial_time / parallel_time:.2f}x")
+        if not same_results(serial, parallel):
+            print("ВНИМАНИЕ: результаты различаются!")
+
+
+def measure(func):
+    """Выполнить функцию и вернуть (результат, время, пик выделенной памяти)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def legacy_sheet_emails(extractor, workbook):
+    """Прежний способ: собрать весь текст книги в одну строку через +=."""
+    text = ''
+    for sheet in workbook.worksheets:
+        for row in sheet.iter_rows(values_only=True):
+            for cell in row:
+                if cell:
+                    text += str(cell) + '\n'
+    return extractor.extract_emails_from_text(text)
+
+
+def sheet_fragments(workbook):
+    """Новый способ: выдавать ячейки по одной."""
+    for sheet in workbook.worksheets:
+        for row in sheet.iter_rows(values_only=True):
+            for cell in row:
+                if cell:
+                    yield str(cell)
+
+
+def bench_fragments(args):
+    """Сравнить накопление текста через += и поиск по пачкам фрагментов."""
+    if not find_emails.XLSX_AVAILABLE:
+        print("Требуется openpyxl")
+        return
+
+    rng = random.Random(args.seed)
+    workbook = find_emails.openpyxl.Workbook()
+    sheet = workbook.active
+    for _ in range(args.rows):
+        sheet.append([random_paragraph(rng, words=3, email_rate=0.02) for _ in range(10)])
+
+    extractor = EmailExtractor()
+    legacy, legacy_time, legacy_peak = measure(lambda: legacy_sheet_emails(extractor, workbook))
+    streamed, streamed_time, streamed_peak = measure(
+        lambda: extractor.extract_emails_from_fragments(sheet_fragments(workbook))
+    )
+
+    print(f"Ячеек: {args.rows * 10}")
+    print(f"Через +=:       {legacy_time:.2f} с, пик памяти {legacy_peak / 2**20:.1f} МБ")
+    print(f"По фрагментам:  {streamed_time:.2f} с, пик памяти {streamed_peak / 2**20:.1f} МБ")
+    if legacy != streamed:
+        print("ВНИМАНИЕ: результаты различаются!")
+
+
+def bench_matching(args):
+    """Сравнить EMAIL_PATTERN.findall по всему тексту и поиск от символов @."""
+    rng = random.Random(args.seed)
+    paragraphs = []
+    length = 0
+    while length < args.megabytes * 2**20:
+        paragraph = random_paragraph(rng, words=60, email_rate=args.email_rate)
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 1
+    text = '\n'.join(paragraphs)
+
+    extractor = EmailExtractor()
+    started = time.perf_counter()
+    oracle = set(EmailExtractor.EMAIL_PATTERN.findall(text))
+    regex_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    found = extractor.extract_emails_from_text(text)
+    prefilter_time = time.perf_counter() - started
+
+    megabytes = len(text) / 2**20
+    print(f"Текст: {megabytes:.1f} млн символов, доля адресов среди слов: {args.email_rate}")
+    print(f"EMAIL_PATTERN.findall:  {megabytes / regex_time:.1f} млн символов/с")
+    print(f"Поиск от @:             {megabytes / prefilter_time:.1f} млн символов/с")
+    if found != oracle:
+        print("ВНИМАНИЕ: результаты различаются!")
+
+
+def legacy_docx_text(file_path):
+    """Прежний способ: текст абзацев и таблиц через объектную модель python-docx."""
+    doc = Document(file_path)
+    for paragraph in doc.paragraphs:
+        yield paragraph.text
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                yield cell.text
+
+
+def legacy_pptx_text(file_path):
+    """Прежний способ: текст фигур и таблиц через объектную модель python-pptx."""
+    prs = Presentation(file_path)
+    for slide in prs.slides:
+        for shape in slide.shapes:
+            if hasattr(shape, "text"):
+                yield shape.text
+            if shape.has_table:
+                for row in shape.table.rows:
+                    for cell in row.cells:
+                        yield cell.text
+
+
+def generate_ooxml_documents(directory, files, seed=0):
+    """
+    Создать документы .docx и .pptx, в которых адреса есть не только в основном тексте.
+
+    Returns:
+        Список кортежей (путь, множество адресов, которые должны быть найдены)
+    """
+    rng = random.Random(seed)
+    documents = []
+    for i in range(files):
+        expected = set()
+
+        def paragraph(words):
+            text = random_paragraph(rng, words=words, email_rate=0.05)
+            expected.update(word for word in text.split() if '@' in word)
+            return text
+
+        def hidden_email():
+            address = random_email(rng)
+            expected.add(address)
+            return address
+
+        if i % 2 == 0 and DOCX_AVAILABLE:
+            path = Path(directory) / f"doc_{i:05d}.docx"
+            document = Document()
+            for _ in range(200):
+                document.add_paragraph(paragraph(40))
+            table = document.add_table(rows=20, cols=3)
+            for cell in table._cells:
+                cell.text = paragraph(5)
+            section = document.sections[0]
+            section.header.paragraphs[0].text = f"Контакты: {hidden_email()}"
+            section.footer.paragraphs[0].text = f"Поддержка: {hidden_email()}"
+            document.part.relate_to(
+                f"mailto:{hidden_email()}",
+                'http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink',
+                is_external=True
+            )
+            document.save(path)
+        elif PPTX_AVAILABLE:
+            path = Path(directory) / f"slides_{i:05d}.pptx"
+            presentation = Presentation()
+            for _ in range(20):
+                slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+                slide.shapes.title.text = paragraph(5)
+                slide.placeholders[1].text = paragraph(60)
+                slide.notes_slide.notes_text_frame.text = f"Заметки: {hidden_email()}"
+            presentation.save(path)
+        else:
+            continue
+        documents.append((path, expected))
+    return documents
+
+
+def bench_ooxml(args):
+    """Сравнить объектные модели python-docx/python-pptx и разбор XML внутри архива."""
+    if not (DOCX_AVAILABLE or PPTX_AVAILABLE):
+        print("Требуется python-docx или python-pptx")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        documents = generate_ooxml_documents(directory, args.files, args.seed)
+        extractor = EmailExtractor()
+
+        def legacy(path):
+            reader = legacy_docx_text if path.suffix == '.docx' else legacy_pptx_text
+            return extractor.extract_emails_from_fragments(reader(path))
+
+        def streamed(path):
+            return extractor.extract_file(path)
+
+        expected_total = sum(len(expected) for _, expected in documents)
+        print(f"Документов: {len(documents)}, адресов: {expected_total}")
+        for title, method in (("Объектная модель:", legacy), ("XML в архиве:    ", streamed)):
+            found = 0
+            started = time.perf_counter()
+            for path, expected in documents:
+                found += len(method(path) & expected)
+            elapsed = time.perf_counter() - started
+            print(f"{title} {elapsed:.2f} с, найдено {found / expected_total:.1%} адресов")
+
+
+class ThrottledFileIO(io.FileIO):
+    """Файл, каждое чтение которого ждет заданное время (как сетевая папка)."""
+
+    latency = 0.0
+
+    def __init__(self, path):
+        time.sleep(self.latency)  # открытие файла тоже идет по сети
+        super().__init__(path, 'rb')
+
+    def readinto(self, buffer):
+        time.sleep(self.latency)
+        return super().readinto(buffer)
+
+    def readall(self):
+        time.sleep(self.latency)
+        return super().readall()
+
+
+def throttled_open(path):
+    """Замена find_emails._open_path: открыть файл на «медленной файловой системе»."""
+    return io.BufferedReader(ThrottledFileIO(path), buffer_size=256 * 1024)
+
+
+def bench_prefetch(args):
+    """Сравнить обработку с заранее прочитанными файлами и без на медленной файловой системе."""
+    ThrottledFileIO.latency = args.latency / 1000
+    original_open = find_emails._open_path
+    find_emails._open_path = throttled_open
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            generate_corpus(directory, args.files, args.seed)
+
+            timings = []
+            extractors = []
+            for prefetch in (0, args.prefetch):
+                extractor = EmailExtractor(prefetch=prefetch)
+                started = time.perf_counter()
+                extractor.process_directory(directory)
+                timings.append(time.perf_counter() - started)
+                extractors.append(extractor)
+    finally:
+        find_emails._open_path = original_open
+
+    print(f"Файлов: {args.files}, задержка чтения: {args.latency} мс")
+    print(f"Без чтения заранее:       {timings[0]:.2f} с")
+    print(f"Чтение заранее ({args.prefetch} файлов): {timings[1]:.2f} с")
+    print(f"Ускорение:                {timings[0] / timings[1]:.2f}x")
+    if not same_results(*extractors):
+        print("ВНИМАНИЕ: результаты различаются!")
+
+
+def bench_pdfpages(args):
+    """Сравнить последовательный и параллельный разбор страниц больших PDF."""
+    rng = random.Random(args.seed)
+    cpus = find_emails._available_cpus()
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(args.files):
+            # В PDF записывается только латиница (шрифт Helvetica)
+            lines = [' '.join(word if word.isascii() else 'text' for word in random_paragraph(rng, 6, 0).split())
+                     + f" user{i}.{line}@example.com" for line in range(args.pages * 50)]
+            path = Path(directory) / f"big_{i}.pdf"
+            write_simple_pdf(path, lines)
+            paths.append(str(path))
+
+        results = []
+        timings = []
+        for workers in (1, args.workers):
+            extractor = EmailExtractor(pdf_page_workers=workers)
+            file_timings = []
+            emails = set()
+            for path in paths:
+                started = time.perf_counter()
+                emails |= extractor.extract_from_pdf(path)
+                file_timings.append(time.perf_counter() - started)
+            find_emails.shutdown_pdf_page_pool()
+            results.append(emails)
+            timings.append(file_timings)
+
+    serial, parallel = timings
+    print(f"Файлов: {args.files} по {args.pages} страниц, доступно процессоров: {cpus}")
+    if min(args.workers, cpus) < 2 or args.pages < EmailExtractor.PDF_PARALLEL_MIN_PAGES:
+        print(f"Параллельный разбор не используется (нужно не меньше 2 процессоров "
+              f"и {EmailExtractor.PDF_PARALLEL_MIN_PAGES} страниц)")
+    print(f"Последовательно:                  {sum(serial):.2f} с ({sum(serial) / args.files:.2f} с на файл)")
+    print(f"{args.workers} процесса, первый файл (запуск пула): {parallel[0]:.2f} с")
+    if args.files > 1:
+        rest = sum(parallel[1:]) / (args.files - 1)
+        print(f"{args.workers} процесса, следующие файлы:       {rest:.2f} с на файл "
+              f"(ускорение {sum(serial[1:]) / (args.files - 1) / rest:.2f}x)")
+    print(f"Всего: {sum(parallel):.2f} с, ускорение {sum(serial) / sum(parallel):.2f}x")
+    if results[0] != results[1]:
+        print("ВНИМАНИЕ: результаты различаются!")
+
+
+OLE_SECTOR_SIZE = 512
+OLE_MINI_SECTOR_SIZE = 64
+OLE_MINI_CUTOFF = 4096
+OLE_FREE_SECTOR = 0xFFFFFFFF
+OLE_END_OF_CHAIN = 0xFFFFFFFE
+OLE_FAT_SECTOR = 0xFFFFFFFD
+OLE_NO_STREAM = 0xFFFFFFFF
+
+
+def build_ole(tree):
+    """
+    Собрать составной файл OLE2 (версия 3, секторы по 512 байт).
+
+    Потоки короче 4096 байт попадают в мини-поток, остальные — в обычные
+    секторы, поэтому один файл проверяет оба способа хранения.
+
+    Args:
+        tree: Словарь {имя: байты потока или словарь вложенного хранилища}
+
+    Returns:
+        Содержимое файла
+    """
+    entries = [{'name': 'Root Entry', 'type': 5, 'right': OLE_NO_STREAM, 'child': OLE_NO_STREAM}]
+    pending = [(0, tree)]
+    while pending:
+        parent, children = pending.pop()
+        previous = None
+        # Братья связаны цепочкой right в порядке, который требует формат: по длине, затем по имени
+        for name in sorted(children, key=lambda name: (len(name), name.upper())):
+            value = children[name]
+            index = len(entries)
+            entries.append({
+                'name': name, 'type': 1 if isinstance(value, dict) else 2,
+                'right': OLE_NO_STREAM, 'child': OLE_NO_STREAM, 'data': value,
+            })
+            if previous is None:
+                entries[parent]['child'] = index
+            else:
+                entries[previous]['right'] = index
+            previous = index
+            if isinstance(value, dict):
+                pending.append((index, value))
+
+    sectors = []
+    fat = []
+
+    def allocate(data, size, blocks, table):
+        """Записать данные в цепочку блоков и вернуть номер первого блока."""
+        if not data:
+            return OLE_END_OF_CHAIN
+        start = len(blocks)
+        count = -(-len(data) // size)
+        for i in range(count):
+            blocks.append(data[i * size:(i + 1) * size].ljust(size, b'\x00'))
+            table.append(start + i + 1 if i + 1 < count else OLE_END_OF_CHAIN)
+        return start
+
+    mini_sectors = []
+    mini_fat = []
+    for entry in entries:
+        data = entry.get('data')
+        if entry['type'] != 2:
+            entry.update(start=OLE_END_OF_CHAIN if entry['type'] == 1 else 0, size=0)
+        elif len(data) < OLE_MINI_CUTOFF:
+            entry.update(start=allocate(data, OLE_MINI_SECTOR_SIZE, mini_sectors, mini_fat), size=len(data))
+        else:
+            entry.update(start=allocate(data, OLE_SECTOR_SIZE, sectors, fat), size=len(data))
+
+    mini_stream = b''.join(mini_sectors)
+    mini_fat_data = struct.pack(f'<{len(mini_fat)}I', *mini_fat)
+    mini_fat_start = allocate(mini_fat_data, OLE_SECTOR_SIZE, sectors, fat)
+    entries[0].update(start=allocate(mini_stream, OLE_SECTOR_SIZE, sectors, fat), size=len(mini_stream))
+
+    directory = b''
+    for entry in entries:
+        name = entry['name'].encode('utf-16-le')
+        directory += struct.pack(
+            '<64sHBB3I16sIQQIQ', name, len(name) + 2, entry['type'], 1, OLE_NO_STREAM,
+            entry['right'], entry['child'], b'', 0, 0, 0, entry['start'], entry['size']
+        )
+    # Сектор каталога дополняется пустыми записями
+    empty = struct.pack('<64sHBB3I16sIQQIQ', b'', 0, 0, 0, *[OLE_NO_STREAM] * 3, b'', 0, 0, 0, 0, 0)
+    directory += empty * (-len(entries) % (OLE_SECTOR_SIZE // 128))
+    directory_start = allocate(directory, OLE_SECTOR_SIZE, sectors, fat)
+
+    # Секторы FAT идут последними и сами отмечаются в FAT
+    per_sector = OLE_SECTOR_SIZE // 4
+    fat_count = -(-len(sectors) // (per_sector - 1))
+    fat_sectors = list(range(len(sectors), len(sectors) + fat_count))
+    fat += [OLE_FAT_SECTOR] * fat_count
+    fat += [OLE_FREE_SECTOR] * (fat_count * per_sector - len(fat))
+    sectors.append(struct.pack(f'<{len(fat)}I', *fat))
+
+    header = struct.pack(
+        '<8s16sHHHHH6s9I', find_emails.OLE_SIGNATURE, b'', 0x3E, 3, 0xFFFE, 9, 6, b'',
+        0, fat_count, directory_start, 0, OLE_MINI_CUTOFF, mini_fat_start,
+        -(-len(mini_fat_data) // OLE_SECTOR_SIZE), OLE_END_OF_CHAIN, 0
+    )
+    header += struct.pack('<109I', *fat_sectors, *[OLE_FREE_SECTOR] * (109 - fat_count))
+    return header + b''.join(sectors)
+
+
+def ole_streams(tree, prefix=''):
+    """Полные имена и содержимое всех потоков дерева для build_ole."""
+    streams = {}
+    for name, value in tree.items():
+        if isinstance(value, dict):
+            streams.update(ole_streams(value, f"{prefix}{name}/"))
+        else:
+            streams[prefix + name] = value
+    return streams
+
+
+def build_ole10native(filename, content):
+    """Собрать поток Ole10Native (файл, вставленный в документ как объект «Пакет»)."""
+    temp_path = f"C:\\Temp\\{filename}\x00".encode('latin-1')
+    body = (b'\x02\x00' + filename.encode('latin-1') + b'\x00'
+            + f"C:\\Users\\user\\{filename}\x00".encode('latin-1')
+            + b'\x00\x00\x03\x00' + struct.pack('<I', len(temp_path)) + temp_path
+            + struct.pack('<I', len(content)) + content)
+    return struct.pack('<I', len(body)) + body
+
+
+def padding(size, seed=0):
+    """Служебные байты без символа @ (чтобы потоки занимали нужное число секторов)."""
+    rng = random.Random(seed)
+    return bytes(rng.choice(b'\x00\x01\x02\x03abcdef ') for _ in range(size))
+
+
+def write_format_fixtures(directory):
+    """
+    Создать файлы старых форматов Office, письмо Outlook и архивы с известными адресами.
+
+    Returns:
+        Кортеж (словарь {имя файла: дерево потоков OLE2}, словарь {путь
+        относительно directory: множество адресов} для файлов и вложений)
+    """
+    directory = Path(directory)
+    trees = {
+        # Текст документа больше 4096 байт и лежит в обычных секторах, таблица — в мини-потоке
+        'legacy.doc': {
+            'WordDocument': padding(6000, 1) + b' word.ascii@doc.example '
+            + 'Пишите: word.utf16@doc.example'.encode('utf-16-le') + padding(300, 2),
+            '1Table': padding(700, 3),
+            '\x05SummaryInformation': padding(200, 4),
+        },
+        # Вся презентация помещается в мини-поток
+        'legacy.ppt': {
+            'PowerPoint Document': padding(900, 5) + 'slide@ppt.example'.encode('utf-16-le'),
+            'Current User': padding(60, 6),
+        },
+        'letter.msg': {
+            '__substg1.0_0037001F': 'Счет для buyer@msg.example'.encode('utf-16-le'),
+            '__substg1.0_1000001F': ('Ответьте на sender@msg.example\r\n' * 150).encode('utf-16-le'),
+            '__substg1.0_0E04001F': 'Покупатель'.encode('utf-16-le'),
+            '__recip_version1.0_#00000000': {
+                '__substg1.0_39FE001F': 'recipient@msg.example'.encode('utf-16-le'),
+            },
+            '__attach_version1.0_#00000000': {
+                '__substg1.0_3707001F': 'contacts.txt'.encode('utf-16-le'),
+                '__substg1.0_3704001F': 'contac~1.txt'.encode('utf-16-le'),
+                '__substg1.0_37010102': b'attachment@msg.example\n' + b'x' * 5000,
+            },
+            '__attach_version1.0_#00000001': {
+                '__substg1.0_3707001F': 'logo.png'.encode('utf-16-le'),
+                '__substg1.0_37010102': b'\x89PNG ignored@msg.example',
+            },
+        },
+        'oleObject1.bin': {
+            '\x01Ole10Native': build_ole10native('embedded.txt', b'embedded@ole.example'),
+            '\x01CompObj': padding(80, 7),
+        },
+    }
+    files = {name: build_ole(tree) for name, tree in trees.items()}
+    for name in ('legacy.doc', 'legacy.ppt', 'letter.msg'):
+        (directory / name).write_bytes(files[name])
+
+    with zipfile.ZipFile(directory / 'report.docx', 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', '<?xml version="1.0"?><Types/>')
+        archive.writestr(
+            'word/document.xml',
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            '<w:body><w:p><w:r><w:t>Отчет: report@docx.example</w:t></w:r></w:p></w:body></w:document>'
+        )
+        archive.writestr('word/embeddings/oleObject1.bin', files['oleObject1.bin'])
+
+    with zipfile.ZipFile(directory / 'bundle.zip', 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('docs/legacy.doc', files['legacy.doc'])
+        archive.writestr('notes.txt', 'zip.note@archive.example')
+    with tarfile.open(directory / 'mail.tar.gz', 'w:gz') as archive:
+        for name in ('letter.msg', 'legacy.ppt'):
+            archive.add(directory / name, arcname=f"mail/{name}")
+
+    doc = {'word.ascii@doc.example', 'word.utf16@doc.example'}
+    ppt = {'slide@ppt.example'}
+    msg = {'buyer@msg.example', 'sender@msg.example', 'recipient@msg.example'}
+    attachment = 'letter.msg!/__attach_version1.0_#00000000/contacts.txt'
+    expected = {
+        'legacy.doc': doc,
+        'legacy.ppt': ppt,
+        'letter.msg': msg,
+        attachment: {'attachment@msg.example'},
+        'report.docx': {'report@docx.example'},
+        'report.docx!/word/embeddings/oleObject1.bin/embedded.txt': {'embedded@ole.example'},
+        'bundle.zip': set(),
+        'bundle.zip!/docs/legacy.doc': doc,
+        'bundle.zip!/notes.txt': {'zip.note@archive.example'},
+        'mail.tar.gz': set(),
+        'mail.tar.gz!/mail/letter.msg': msg,
+        f"mail.tar.gz!/mail/{attachment}": {'attachment@msg.example'},
+        'mail.tar.gz!/mail/legacy.ppt': ppt,
+    }
+    return trees, expected
+
+
+def check_formats(directory, trees, expected):
+    """
+    Проверить разбор файлов, созданных write_format_fixtures.
+
+    Returns:
+        Список описаний расхождений (пустой, если все совпало)
+    """
+    failures = []
+    for name, tree in trees.items():
+        ole = find_emails.open_ole(io.BytesIO(build_ole(tree)))
+        streams = ole_streams(tree)
+        if ole.streams != sorted(streams):
+            failures.append(f"{name}: потоки {ole.streams}, ожидались {sorted(streams)}")
+            continue
+        for stream, data in streams.items():
+            if ole.read(stream) != data:
+                failures.append(f"{name}: поток {stream!r} прочитан неверно")
+
+    extractor = EmailExtractor()
+    found = {}
+    for path in sorted(Path(directory).iterdir()):
+        for member, emails, error in extractor.extract_file_results(path):
+            member = os.path.relpath(member, directory)
+            if error:
+                failures.append(f"{member}: {error}")
+            found[member] = emails
+    for path in sorted(set(found) | set(expected)):
+        if found.get(path) != expected.get(path):
+            failures.append(f"{path}: найдено {sorted(found.get(path) or ())}, "
+                            f"ожидалось {sorted(expected.get(path, ()))}")
+    return failures
+
+
+def bench_formats(args):
+    """Проверить разбор .doc, .ppt, .msg, встроенных объектов и архивов на собранных вручную файлах."""
+    backends = [('OleCompoundFile', False)]
+    if find_emails.OLEFILE_AVAILABLE:
+        backends.append(('olefile', True))
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        trees, expected = write_format_fixtures(directory)
+        for backend, use_olefile in backends:
+            original = find_emails.OLEFILE_AVAILABLE
+            find_emails.OLEFILE_AVAILABLE = use_olefile
+            try:
+                failures = check_formats(directory, trees, expected)
+            finally:
+                find_emails.OLEFILE_AVAILABLE = original
+            print(f"{backend}: {'OK' if not failures else 'ОШИБКИ'} ({len(expected)} файлов и вложений)")
+            for failure in failures:
+                print(f"  {failure}")
+            failed = failed or bool(failures)
+    return 1 if failed else 0
+
+
+SUITE_FORMATS = ('docx', 'xlsx', 'pptx', 'pdf', 'txt', 'doc', 'ppt')
+
+# Обработчик каждого формата в EmailExtractor
+SUITE_EXTRACTORS = {
+    'docx': 'extract_from_docx',
+    'xlsx': 'extract_from_xlsx',
+    'pptx': 'extract_from_pptx',
+    'pdf': 'extract_from_pdf',
+    'txt': 'extract_from_txt',
+    'doc': 'extract_from_doc',
+    'ppt': 'extract_from_ppt',
+}
+
+
+def pdf_escape(text):
+    """Экранировать строку для оператора Tj в PDF."""
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_simple_pdf(path, lines, lines_per_page=50):
+    """
+    Записать PDF с текстом (латиница, шрифт Helvetica) без сторонних библиотек.
+
+    Args:
+        path: Путь к файлу
+        lines: Строки текста
+        lines_per_page: Количество строк на странице
+    """
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in pages:
+        content = "BT /F1 10 Tf 12 TL 40 800 Td " + ' '.join(f"({pdf_escape(line)}) Tj T*" for line in page) + " ET"
+        content = content.encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+        )
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b' '.join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids)
+    )
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    Path(path).write_bytes(bytes(output))
+
+
+def wrap_words(text, width=90):
+    """Разбить текст на строки не длиннее width, не разрывая слова."""
+    lines = []
+    line = ''
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def generate_suite_corpus(directory, files, paragraphs=50, email_rate=0.02, seed=0, formats=SUITE_FORMATS):
+    """
+    Создать воспроизводимый набор документов с заранее известными адресами.
+
+    Args:
+        directory: Папка для файлов
+        files: Количество файлов (форматы чередуются)
+        paragraphs: Количество абзацев в файле (размер документа)
+        email_rate: Доля адресов среди слов текста
+        seed: Зерно генератора случайных чисел
+        formats: Форматы документов
+
+    Returns:
+        Словарь {путь: множество адресов, которые есть в файле}
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    available = {
+        'docx': DOCX_AVAILABLE,
+        'xlsx': find_emails.XLSX_AVAILABLE,
+        'pptx': PPTX_AVAILABLE,
+        'pdf': True,
+        'txt': True,
+        'doc': True,
+        'ppt': True,
+    }
+    formats = [kind for kind in formats if available[kind]]
+    truth = {}
+
+    for i in range(files):
+        kind = formats[i % len(formats)]
+        path = directory / f"{i // 100:03d}" / f"{kind}_{i:05d}.{kind}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        texts = [random_paragraph(rng, words=40, email_rate=email_rate) for _ in range(paragraphs)]
+        truth[str(path)] = {word for text in texts for word in text.split() if '@' in word}
+
+        if kind == 'txt':
+            path.write_text('\n'.join(texts), encoding='utf-8')
+        elif kind == 'pdf':
+            # Стандартный шрифт PDF без встраивания не содержит кириллицы
+            latin = [' '.join(word if word.isascii() else 'text' for word in text.split()) for text in texts]
+            write_simple_pdf(path, [line for text in latin for line in wrap_words(text)])
+        elif kind == 'docx':
+            document = Document()
+            for text in texts:
+                document.add_paragraph(text)
+            document.save(path)
+        elif kind == 'xlsx':
+            workbook = find_emails.openpyxl.Workbook()
+            sheet = workbook.active
+            for text in texts:
+                words = text.split()
+                sheet.append([' '.join(words[j:j + 8]) for j in range(0, len(words), 8)])
+            workbook.save(path)
+        elif kind == 'pptx':
+            presentation = Presentation()
+            for j in range(0, len(texts), 5):
+                slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+                slide.shapes.title.text = 'Slide'
+                slide.placeholders[1].text = '\n'.join(texts[j:j + 5])
+            presentation.save(path)
+        elif kind in ('doc', 'ppt'):
+            # Текст в UTF-16LE, как в документах Word и PowerPoint старого формата
+            stream = 'WordDocument' if kind == 'doc' else 'PowerPoint Document'
+            path.write_bytes(build_ole({stream: '\r'.join(texts).encode('utf-16-le'), 'Current User': padding(60)}))
+    return truth
+
+
+def peak_rss_mb():
+    """Пиковый объем памяти текущего процесса, МБ (None, если узнать нельзя)."""
+    # VmHWM считается заново после exec, а ru_maxrss в Linux достается от родителя
+    try:
+        with open('/proc/self/status', encoding='ascii') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS — в байтах
+    return usage / (2**20 if sys.platform == 'darwin' else 1024)
+
+
+def recall(found, expected):
+    """Доля ожидаемых адресов, которые были найдены."""
+    total = sum(len(emails) for emails in expected.values())
+    hits = sum(len(set(found.get(path, ())) & emails) for path, emails in expected.items())
+    return hits / total if total else 1.0
+
+
+def run_suite_stage(stage, directory, truth, workers):
+    """
+    Выполнить один этап замеров (в отдельном процессе, чтобы пик памяти был честным).
+
+    Returns:
+        Словарь с метриками этапа
+    """
+    extractor = EmailExtractor(workers=workers)
+    started = time.perf_counter()
+
+    if stage == 'find_files':
+        files = extractor.find_files(directory)
+        elapsed = time.perf_counter() - started
+        return {'seconds': elapsed, 'files_per_second': len(files) / elapsed, 'peak_rss_mb': peak_rss_mb()}
+
+    if stage == 'process_directory':
+        extractor.process_directory(directory)
+        elapsed = time.perf_counter() - started
+        found = {}
+        for email, paths in extractor.found_emails.items():
+            for path in paths:
+                found.setdefault(path, set()).add(email)
+        paths = list(truth)
+    else:
+        kind = stage.split(':', 1)[1]
+        paths = [path for path in truth if path.endswith(f".{kind}")]
+        method = getattr(extractor, SUITE_EXTRACTORS[kind])
+        found = {path: method(Path(path)) for path in paths}
+        elapsed = time.perf_counter() - started
+
+    megabytes = sum(os.path.getsize(path) for path in paths) / 2**20
+    false_positives = sum(len(set(found.get(path, ())) - truth[path]) for path in paths)
+    return {
+        'seconds': elapsed,
+        'files_per_second': len(paths) / elapsed if elapsed else None,
+        'megabytes_per_second': megabytes / elapsed if elapsed else None,
+        'recall': recall(found, {path: truth[path] for path in paths}),
+        'false_positives': false_positives,
+        'errors': len(extractor.errors),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _isolated_entry(results, func, args):
+    """Выполнить функцию в дочернем процессе и передать результат через очередь."""
+    results.put(func(*args))
+
+
+def run_isolated(func, *args):
+    """
+    Выполнить функцию в отдельном процессе (spawn) и вернуть ее результат.
+
+    Обычный (не демонический) процесс нужен, чтобы process_directory мог
+    запустить собственный пул процессов.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_isolated_entry, args=(results, func, args))
+    process.start()
+    try:
+        return results.get()
+    finally:
+        process.join()
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Сравнить результаты с сохраненными и выдать описания регрессий.
+
+    Скорость считается ухудшившейся, если упала больше чем на tolerance
+    (доля), полнота — при любом снижении, память — при росте больше чем на tolerance.
+    """
+    regressions = []
+    for stage, metrics in results['stages'].items():
+        old = baseline.get('stages', {}).get(stage)
+        if not old:
+            continue
+        for key in ('files_per_second', 'megabytes_per_second'):
+            if metrics.get(key) and old.get(key) and metrics[key] < old[key] * (1 - tolerance):
+                regressions.append(f"{stage}: {key} {old[key]:.1f} -> {metrics[key]:.1f}")
+        if metrics.get('recall') is not None and old.get('recall') is not None \
+                and metrics['recall'] < old['recall'] - 1e-9:
+            regressions.append(f"{stage}: recall {old['recall']:.2%} -> {metrics['recall']:.2%}")
+        if metrics.get('peak_rss_mb') and old.get('peak_rss_mb') \
+                and metrics['peak_rss_mb'] > old['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{stage}: peak_rss_mb {old['peak_rss_mb']:.0f} -> {metrics['peak_rss_mb']:.0f}")
+    return regressions
+
+
+def bench_suite(args):
+    """Сквозные замеры на воспроизводимом наборе документов с известными адресами."""
+    with tempfile.TemporaryDirectory() as temp_directory:
+        directory = args.corpus or temp_directory
+        truth = generate_suite_corpus(directory, args.files, args.paragraphs, args.email_rate, args.seed)
+        kinds = sorted({Path(path).suffix[1:] for path in truth})
+        stages = ['find_files'] + [f"extract:{kind}" for kind in kinds] + ['process_directory']
+
+        results = {
+            'parameters': {
+                'files': args.files, 'paragraphs': args.paragraphs, 'email_rate': args.email_rate,
+                'seed': args.seed, 'workers': args.workers, 'repeat': args.repeat,
+            },
+            'environment': {
+                'python': platform.python_version(), 'platform': platform.platform(),
+                'cpu_count': os.cpu_count(), 'pdf_backend': find_emails.PDF_BACKEND,
+            },
+            'stages': {},
+        }
+        for stage in stages:
+            # Лучший из нескольких прогонов меньше зависит от случайных помех
+            metrics = min(
+                (run_isolated(run_suite_stage, stage, directory, truth, args.workers)
+                 for _ in range(max(1, args.repeat))),
+                key=lambda metrics: metrics['seconds']
+            )
+            results['stages'][stage] = metrics
+            line = f"{stage:20} {metrics['seconds']:8.2f} с  {metrics['files_per_second'] or 0:9.1f} файл/с"
+            if 'recall' in metrics:
+                line += (f"  {metrics['megabytes_per_second'] or 0:7.2f} МБ/с"
+                         f"  полнота {metrics['recall']:.2%}  лишних {metrics['false_positives']}")
+            if metrics['peak_rss_mb'] is not None:
+                line += f"  пик памяти {metrics['peak_rss_mb']:.0f} МБ"
+            print(line)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline.get('parameters') != results['parameters']:
+            print("ВНИМАНИЕ: параметры набора отличаются от сохраненных")
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"РЕГРЕССИЯ: {regression}")
+        if regressions:
+            return 1
+        print("Регрессий нет")
+    return 0
+
+
+HEAVY_MODULES = ('openpyxl', 'pypdf', 'PyPDF2', 'pdfminer', 'xlrd', 'olefile', 'tkinter', 'docx', 'pptx')
+
+
+def import_time_ms():
+    """Время импорта find_emails в новом процессе по данным -X importtime, мс."""
+    script = Path(__file__).resolve().parent
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import find_emails'],
+        cwd=script, capture_output=True, text=True, check=True
+    )
+    for line in reversed(completed.stderr.splitlines()):
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == 'find_emails':
+            return int(parts[1]) / 1000
+    return None
+
+
+def bench_startup(args):
+    """Замерить стоимость запуска: импорт модуля и короткий прогон по папке с текстовыми файлами."""
+    script = Path(__file__).resolve().parent
+    loaded = subprocess.run(
+        [sys.executable, '-c',
+         'import sys, find_emails; print(" ".join(sorted(m for m in %r if m in sys.modules)))' % (HEAVY_MODULES,)],
+        cwd=script, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+    imports = [import_time_ms() for _ in range(args.repeat)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(args.files):
+            Path(directory, f"note_{i}.txt").write_text(f"user{i}@example.com", encoding='utf-8')
+        runs = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            subprocess.run(
+                [sys.executable, str(script / 'find_emails.py'), 'scan', directory, '-w', '1'],
+                capture_output=True, check=True
+            )
+            runs.append(time.perf_counter() - started)
+
+    print(f"Импорт find_emails:            {statistics.median(imports):.0f} мс (медиана из {args.repeat})")
+    print(f"Библиотеки, загруженные сразу: {loaded or 'нет'}")
+    print(f"scan по {args.files} txt файлам:      {statistics.median(runs) * 1000:.0f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности find_emails")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parallel = subparsers.add_parser('parallel', help="последовательная и параллельная обработка")
+    parallel.add_argument('--files', type=int, default=200)
+    parallel.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parallel.add_argument('--seed', type=int, default=0)
+    parallel.set_defaults(func=bench_parallel)
+
+    fragments = subparsers.add_parser('fragments', help="накопление текста большой книги Excel")
+    fragments.add_argument('--rows', type=int, default=100000)
+    fragments.add_argument('--seed', type=int, default=0)
+    fragments.set_defaults(func=bench_fragments)
+
+    matching = subparsers.add_parser('matching', help="скорость поиска адресов в тексте")
+    matching.add_argument('--megabytes', type=float, default=20)
+    matching.add_argument('--email-rate', type=float, default=0.002)
+    matching.add_argument('--seed', type=int, default=0)
+    matching.set_defaults(func=bench_matching)
+
+    ooxml = subparsers.add_parser('ooxml', help="чтение .docx и .pptx: объектная модель и XML")
+    ooxml.add_argument('--files', type=int, default=40)
+    ooxml.add_argument('--seed', type=int, default=0)
+    ooxml.set_defaults(func=bench_ooxml)
+
+    prefetch = subparsers.add_parser('prefetch', help="чтение файлов заранее при медленной файловой системе")
+    prefetch.add_argument('--files', type=int, default=100)
+    prefetch.add_argument('--latency', type=float, default=20, help="задержка каждого чтения, мс")
+    prefetch.add_argument('--prefetch', type=int, default=8)
+    prefetch.add_argument('--seed', type=int, default=0)
+    prefetch.set_defaults(func=bench_prefetch)
+
+    pdfpages = subparsers.add_parser('pdfpages', help="параллельный разбор страниц больших PDF")
+    pdfpages.add_argument('--pages', type=int, default=400)
+    pdfpages.add_argument('--files', type=int, default=4)
+    pdfpages.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    pdfpages.add_argument('--seed', type=int, default=0)
+    pdfpages.set_defaults(func=bench_pdfpages)
+
+    formats = subparsers.add_parser('formats', help="проверка разбора .doc, .ppt, .msg и архивов")
+    formats.set_defaults(func=bench_formats)
+
+    suite = subparsers.add_parser('suite', help="сквозные замеры на наборе документов с известными адресами")
+    suite.add_argument('--files', type=int, default=100)
+    suite.add_argument('--paragraphs', type=int, default=50, help="абзацев в документе")
+    suite.add_argument('--email-rate', type=float, default=0.02, help="доля адресов среди слов")
+    suite.add_argument('--workers', type=int, default=1, help="процессов для process_directory")
+    suite.add_argument('--repeat', type=int, default=3, help="прогонов каждого этапа (берется лучший)")
+    suite.add_argument('--seed', type=int, default=0)
+    suite.add_argument('--corpus', help="папка для набора документов (по умолчанию временная)")
+    suite.add_argument('--save-baseline', metavar='FILE', help="сохранить результаты в JSON")
+    suite.add_argument('--baseline', metavar='FILE', help="сравнить с сохраненными результатами")
+    suite.add_argument('--tolerance', type=float, default=0.1,
+                       help="допустимое снижение скорости (доля, по умолчанию 0.1)")
+    suite.set_defaults(func=bench_suite)
+
+    startup = subparsers.add_parser('startup', help="время импорта и короткого запуска")
+    startup.add_argument('--files', type=int, default=20)
+    startup.add_argument('--repeat', type=int, default=5)
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,49 +7,114 @@
 import os
 import re
 import csv
+import fnmatch
 from pathlib import Path
-from tkinter import filedialog, messagebox, Tk
-from tkinter.ttk import Progressbar
-import tkinter as tk
 from threading import Thread
+import threading
+from contextlib import contextmanager
+from functools import partial
+import multiprocessing
+import signal
+import sqlite3
+import hashlib
+import json
+import argparse
+import sys
+import heapq
+import cProfile
+import queue
+from collections import deque
+from collections.abc import Mapping
+from array import array
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import unquote
+import importlib
+import importlib.util
+import select
+import zipfile
+import tarfile
+import io
+from email import message_from_binary_file
+import struct
+from xml.etree import ElementTree
 import time
 
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
-
-try:
-    import openpyxl
-    XLSX_AVAILABLE = True
-except ImportError:
-    XLSX_AVAILABLE = False
-
-try:
-    import PyPDF2
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
-
-try:
-    from pptx import Presentation
-    PPTX_AVAILABLE = True
-except ImportError:
-    PPTX_AVAILABLE = False
-
-try:
-    import xlrd
-    XLS_AVAILABLE = True
-except ImportError:
-    XLS_AVAILABLE = False
+class _LazyModule:
+    """
+    Модуль, который импортируется при первом обращении к его атрибутам.
+    
+    Тяжелые библиотеки (openpyxl, pypdf, tkinter) нужны не при каждом
+    запуске: папка с текстовыми файлами не должна ждать их импорта, как
+    и каждый дочерний процесс пула.
+    """
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+
+def _module_available(name):
+    """Проверить, установлен ли модуль, не импортируя его."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# Модули стандартной библиотеки, которые нужны не при каждом запуске
+email_policy = _LazyModule('email.policy')
+importlib_metadata = _LazyModule('importlib.metadata')
+ctypes = _LazyModule('ctypes')
+gzip = _LazyModule('gzip')
+# Ограничение памяти дочерних процессов (есть только в POSIX)
+resource = _LazyModule('resource')
+RESOURCE_AVAILABLE = _module_available('resource')
+
+tk = _LazyModule('tkinter')
+ttk = _LazyModule('tkinter.ttk')
+filedialog = _LazyModule('tkinter.filedialog')
+messagebox = _LazyModule('tkinter.messagebox')
+TK_AVAILABLE = _module_available('_tkinter')
+
+openpyxl = _LazyModule('openpyxl')
+XLSX_AVAILABLE = _module_available('openpyxl')
+
+# Для PDF используется самая быстрая из установленных библиотек
+PDF_BACKEND = next((name for name in ('pypdf', 'PyPDF2', 'pdfminer') if _module_available(name)), None)
+PDF_AVAILABLE = PDF_BACKEND is not None
+PyPDF2 = _LazyModule(PDF_BACKEND if PDF_BACKEND in ('pypdf', 'PyPDF2') else 'PyPDF2')
+pdfminer_high_level = _LazyModule('pdfminer.high_level')
+pdfminer_layout = _LazyModule('pdfminer.layout')
+
+xlrd = _LazyModule('xlrd')
+XLS_AVAILABLE = _module_available('xlrd')
+
+olefile = _LazyModule('olefile')
+OLEFILE_AVAILABLE = _module_available('olefile')
+
+# Быстрый хэш для поиска одинаковых файлов (если нет — используется blake2b)
+xxhash = _LazyModule('xxhash')
+XXHASH_AVAILABLE = _module_available('xxhash')
 
 
 class EmailExtractor:
     """Класс для извлечения email адресов из документов."""
     
     # Регулярное выражение для поиска email адресов
-    EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+    EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+    
+    # Часть адреса, начиная с @; проверяется первой, прямо в позиции найденного @
+    EMAIL_DOMAIN_PATTERN = re.compile(r'@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+    
+    # Символы, которые могут стоять в адресе перед @
+    EMAIL_LOCAL_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._%+-')
     
     # Поддерживаемые расширения файлов
     SUPPORTED_EXTENSIONS = {
@@ -60,20 +125,153 @@ class EmailExtractor:
         '.pptx': 'PowerPoint',
         '.ppt': 'PowerPoint (старый формат)',
         '.pdf': 'PDF',
-        '.txt': 'Текстовый файл'
+        '.txt': 'Текстовый файл',
+        '.csv': 'Таблица CSV',
+        '.log': 'Журнал',
+        '.eml': 'Письмо',
+        '.json': 'JSON',
+        '.msg': 'Письмо Outlook',
+        '.zip': 'Архив ZIP',
+        '.tar': 'Архив TAR',
+        '.tgz': 'Архив TAR (gzip)',
+        '.tar.gz': 'Архив TAR (gzip)',
+        '.tar.bz2': 'Архив TAR (bzip2)',
+        '.tar.xz': 'Архив TAR (xz)'
     }
     
-    def __init__(self, progress_callback=None, status_callback=None):
+    # Расширения, которые читаются потоком как обычный текст
+    TEXT_EXTENSIONS = ('.txt', '.csv', '.log', '.json')
+    
+    # Контейнеры: их содержимое разбирается прямо из памяти, без распаковки на диск
+    CONTAINER_EXTENSIONS = ('.zip', '.tar', '.tgz', '.tar.gz', '.tar.bz2', '.tar.xz', '.eml', '.msg')
+    ARCHIVE_MULTI_EXTENSIONS = ('.tar.gz', '.tar.bz2', '.tar.xz')
+    
+    # Документы Office Open XML, в которые могут быть встроены другие документы
+    OOXML_EXTENSIONS = ('.docx', '.xlsx', '.pptx')
+    
+    # Части .docx и .pptx, в которых хранится текст (имена в нижнем регистре)
+    DOCX_TEXT_PARTS = (
+        'word/document.xml', 'word/header*.xml', 'word/footer*.xml',
+        'word/footnotes.xml', 'word/endnotes.xml', 'word/comments*.xml',
+    )
+    PPTX_TEXT_PARTS = (
+        'ppt/slides/slide*.xml', 'ppt/notesslides/notesslide*.xml',
+        'ppt/comments/*.xml', 'ppt/slidemasters/slidemaster*.xml',
+    )
+    
+    # Ограничения для контейнеров: глубина вложенности, размер одного элемента
+    # и общий объем распакованных данных одного контейнера (байты)
+    MAX_CONTAINER_DEPTH = 3
+    MAX_MEMBER_SIZE = 256 * 1024 * 1024
+    MAX_CONTAINER_UNPACKED = 1024 * 1024 * 1024
+    
+    # Защита от zip-бомб в документах Office Open XML: предельная степень
+    # сжатия части крупнее MIN_BOMB_PART_SIZE и общий распакованный объем (байты)
+    MAX_COMPRESSION_RATIO = 200
+    MIN_BOMB_PART_SIZE = 1024 * 1024
+    MAX_OOXML_UNPACKED = 1024 * 1024 * 1024
+    
+    # Регулярное выражение для поиска email адресов в байтах (UTF-8 и однобайтовые кодировки)
+    EMAIL_PATTERN_BYTES = re.compile(EMAIL_PATTERN.pattern.encode('ascii'))
+    EMAIL_DOMAIN_PATTERN_BYTES = re.compile(EMAIL_DOMAIN_PATTERN.pattern.encode('ascii'))
+    EMAIL_LOCAL_BYTES = frozenset(''.join(sorted(EMAIL_LOCAL_CHARS)).encode('ascii'))
+    
+    # Байты, которые могут входить в email адрес
+    EMAIL_BYTES = EMAIL_LOCAL_BYTES | frozenset(b'@')
+    
+    # Размер блока при чтении текстовых файлов и максимальный перенос между блоками (байты)
+    TEXT_CHUNK_SIZE = 1024 * 1024
+    TEXT_CHUNK_OVERLAP = 4096
+    
+    # Минимальное количество страниц PDF, которые имеет смысл разбирать параллельно
+    # (см. benchmark.py pdfpages: каждый процесс заново открывает документ)
+    PDF_PARALLEL_MIN_PAGES = 200
+    
+    # Ограничения Excel: строк на листе и символов в ячейке; максимальная ширина столбца
+    EXCEL_MAX_ROWS = 1048576
+    EXCEL_MAX_CELL_LENGTH = 32767
+    EXCEL_MAX_COLUMN_WIDTH = 100
+    
+    # Признаки того, что в листе .xlsx есть строки вне таблицы общих строк
+    XLSX_INLINE_MARKERS = (b'"inlineStr"', b't="str"', b"t='str'")
+    
+    # Формат файла результатов одной части (см. save_partial)
+    PARTIAL_FORMAT = 'find_emails.partial'
+    PARTIAL_VERSION = 1
+    
+    # Размер пачки фрагментов текста, по которой выполняется поиск (символы)
+    FRAGMENT_BATCH_SIZE = 64 * 1024
+    
+    def __init__(self, progress_callback=None, status_callback=None,
+                 workers=1, file_timeout=None, chunk_size=None,
+                 cache_file=None, cache_hash=False, result_callback=None,
+                 cprofile_dir=None, cprofile_formats=None, pdf_page_workers=1,
+                 prefetch=0, prefetch_memory=256 * 1024 * 1024, dedup=False,
+                 journal_file=None, resume=False, max_file_size=None,
+                 memory_budget=1024 * 1024 * 1024, worker_memory_limit=None, shard=None):
         """
         Инициализация экстрактора.
         
         Args:
             progress_callback: Функция для обновления прогресса (current, total)
             status_callback: Функция для обновления статуса (message)
+            workers: Количество процессов для параллельной обработки
+            file_timeout: Ограничение времени обработки одного файла (секунды)
+            chunk_size: Количество файлов, передаваемых процессу за один раз
+            cache_file: Путь к файлу кэша результатов (SQLite) или None
+            cache_hash: Сверять содержимое файлов по хэшу, если изменилось только время
+            result_callback: Функция, вызываемая по готовности каждого файла (path, emails, error)
+            cprofile_dir: Папка для профилей cProfile отдельных файлов или None
+            cprofile_formats: Расширения, которые нужно профилировать (по умолчанию все)
+            pdf_page_workers: Количество процессов для разбора страниц одного PDF
+                (используется, только если сами файлы обрабатываются последовательно)
+            prefetch: Сколько файлов заранее читать в память в фоновых потоках,
+                пока разбирается текущий (0 — не читать заранее)
+            prefetch_memory: Предельный объем заранее прочитанных данных (байты)
+            dedup: Разбирать файлы с одинаковым содержимым один раз
+            journal_file: Путь к журналу обработанных файлов (NDJSON) или None
+            resume: Продолжить прерванный запуск: файлы из журнала не обрабатываются заново
+            max_file_size: Файлы больше этого размера не разбираются, а попадают
+                в ошибки (байты, None — без ограничения)
+            memory_budget: Предельный суммарный размер файлов, одновременно
+                находящихся в обработке у процессов пула (байты, None — без ограничения)
+            worker_memory_limit: Ограничение адресного пространства каждого
+                процесса пула (байты, только POSIX; None — без ограничения)
+            shard: Обрабатывать только свою часть файлов: кортеж (номер части
+                с нуля, количество частей) или None — все файлы
         """
         self.progress_callback = progress_callback
         self.status_callback = status_callback
-        self.found_emails = {}  # {email: [список файлов]}
+        self.result_callback = result_callback
+        self.workers = max(1, workers or 1)
+        self.file_timeout = file_timeout
+        self.chunk_size = chunk_size
+        self.cache_file = cache_file
+        self.cache_hash = cache_hash
+        self.cache = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cprofile_dir = cprofile_dir
+        self.cprofile_formats = cprofile_formats
+        self.pdf_page_workers = max(1, pdf_page_workers or 1)
+        self.prefetch = max(0, prefetch or 0)
+        self.prefetch_memory = prefetch_memory
+        self.dedup = dedup
+        self.journal_file = journal_file
+        self.resume = resume
+        self.journal = None
+        self.journal_hits = 0
+        self.max_file_size = max_file_size
+        self.memory_budget = memory_budget
+        self.worker_memory_limit = worker_memory_limit
+        self.shard = shard
+        self.duplicates = {}  # {путь разбираемого файла: [пути копий]}
+        self.duplicates_skipped = 0
+        self.duplicate_bytes = 0
+        self.profile = ScanProfile()
+        self.match_seconds = 0.0  # время поиска адресов в тексте
+        self.text_length = 0  # объем просмотренного текста
+        self.found_emails = EmailIndex()  # {email: [список файлов]}
         self.processed_files = 0
         self.total_files = 0
         self.errors = []
@@ -88,268 +286,2967 @@ class EmailExtractor:
         if self.status_callback:
             self.status_callback(message)
     
-    def find_files(self, directory):
+    def report_result(self, file_path, emails, error):
+        """Сообщить о готовом результате обработки файла."""
+        if self.result_callback:
+            self.result_callback(str(file_path), emails, error)
+    
+    def iter_files(self, directory, exclude_dirs=None, ignore_paths=()):
+        """
+        Обойти директорию одним проходом и выдавать поддерживаемые файлы.
+        
+        Расширения сравниваются без учета регистра, один и тот же файл
+        (жесткие ссылки, регистронезависимые сетевые папки) выдается один раз.
+        
+        Args:
+            directory: Путь к директории для поиска или список таких путей
+            exclude_dirs: Шаблоны (glob) имен или путей папок, которые нужно пропустить
+            ignore_paths: Файлы, которые не нужно выдавать (результаты, кэш и
+                журнал самой программы, если они лежат в папке поиска)
+            
+        Yields:
+            Пути к файлам (Path) по мере обхода
+        """
+        extensions = tuple(self.supported_extensions())
+        exclude_dirs = list(exclude_dirs or [])
+        seen = set()
+        ignore_paths = {_normalized_path(path) for path in ignore_paths}
+        stack = [os.fspath(root) for root in reversed(_as_path_list(directory))]
+        
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    entries = sorted(entries, key=lambda entry: entry.name)
+            except OSError as e:
+                self.errors.append(f"Не удалось прочитать папку {current}: {str(e)}")
+                continue
+            
+            subdirs = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not self._is_excluded_dir(entry, exclude_dirs):
+                            subdirs.append(entry.path)
+                        continue
+                    if not entry.name.lower().endswith(extensions):
+                        continue
+                    if not entry.is_file():
+                        continue
+                    if ignore_paths and _normalized_path(entry.path) in ignore_paths:
+                        continue
+                    key = self._file_key(entry)
+                except OSError:
+                    continue
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield Path(entry.path)
+            
+            # Обратный порядок, чтобы папки обходились по алфавиту
+            stack.extend(reversed(subdirs))
+    
+    @staticmethod
+    def _is_excluded_dir(entry, exclude_dirs):
+        """Проверить, попадает ли папка под один из шаблонов исключения."""
+        path = entry.path.replace(os.sep, '/')
+        return any(
+            fnmatch.fnmatch(entry.name, pattern) or fnmatch.fnmatch(path, pattern)
+            for pattern in exclude_dirs
+        )
+    
+    def is_supported_file(self, file_path):
+        """Проверить, поддерживается ли файл (по расширению, без учета регистра)."""
+        return str(file_path).lower().endswith(tuple(self.supported_extensions()))
+    
+    @staticmethod
+    def _file_key(entry):
+        """Ключ для удаления дубликатов: (устройство, inode) или нормализованный путь."""
+        # inode() у символической ссылки — номер самой ссылки, поэтому
+        # устройство и inode берутся из stat() файла, на который она указывает
+        stat = entry.stat()
+        if stat.st_ino:
+            return (stat.st_dev, stat.st_ino)
+        return os.path.normcase(os.path.abspath(entry.path))
+    
+    def find_files(self, directory, exclude_dirs=None, ignore_paths=()):
         """
         Найти все поддерживаемые файлы в директории рекурсивно.
         
         Args:
-            directory: Путь к директории для поиска
+            directory: Путь к директории для поиска или список таких путей
+            exclude_dirs: Шаблоны (glob) папок, которые нужно пропустить
+            ignore_paths: Файлы, которые не нужно выдавать (см. iter_files)
             
         Returns:
             Список путей к файлам
         """
-        files = []
-        directory = Path(directory)
+        return sorted(self.iter_files(directory, exclude_dirs, ignore_paths))
+    
+    def extract_emails_from_text(self, text):
+        """
+        Извлечь email адреса из текста.
+        
+        Args:
+            text: Текст для поиска
+            
+        Returns:
+            Множество найденных email адресов
+        """
+        if not text:
+            return set()
+        started = time.perf_counter()
+        emails = set(_find_emails(text, '@', self.EMAIL_PATTERN, self.EMAIL_DOMAIN_PATTERN,
+                                  self.EMAIL_LOCAL_CHARS))
+        self.match_seconds += time.perf_counter() - started
+        self.text_length += len(text)
+        return emails
+    
+    def extract_emails_from_fragments(self, fragments):
+        """
+        Извлечь email адреса из последовательности фрагментов текста.
+        
+        Фрагменты (ячейки, абзацы, страницы) собираются в пачки ограниченного
+        размера, так что память не растет вместе с размером документа.
+        
+        Args:
+            fragments: Итерируемый объект со строками
+            
+        Returns:
+            Множество найденных email адресов
+        """
+        emails = set()
+        batch = []
+        batch_length = 0
+        for fragment in fragments:
+            if not fragment:
+                continue
+            batch.append(fragment)
+            batch_length += len(fragment)
+            if batch_length >= self.FRAGMENT_BATCH_SIZE:
+                emails.update(self.extract_emails_from_text('\n'.join(batch)))
+                batch = []
+                batch_length = 0
+        if batch:
+            emails.update(self.extract_emails_from_text('\n'.join(batch)))
+        return emails
+    
+    def iter_docx_text(self, file_path):
+        """
+        Выдавать текст .docx файла, читая XML внутри архива потоком.
+        
+        Кроме основного текста и таблиц просматриваются колонтитулы,
+        сноски, примечания и адреса гиперссылок из файлов .rels.
+        """
+        yield from self._iter_ooxml_text(file_path, self.DOCX_TEXT_PARTS)
+    
+    @contextmanager
+    def _open_ooxml(self, file_path):
+        """
+        Открыть документ Office Open XML как zip-архив, отказываясь от zip-бомб.
+        
+        Размеры частей берутся из оглавления архива; zipfile не распаковывает
+        больше объявленного размера, поэтому проверки оглавления достаточно.
+        
+        Raises:
+            ValueError: Если части сжаты подозрительно сильно или общий
+                распакованный объем слишком велик
+        """
+        with _open_source(file_path) as file, zipfile.ZipFile(file) as archive:
+            unpacked = 0
+            for info in archive.infolist():
+                unpacked += info.file_size
+                if (info.file_size > self.MIN_BOMB_PART_SIZE
+                        and info.file_size > info.compress_size * self.MAX_COMPRESSION_RATIO):
+                    raise ValueError(f"часть {info.filename} сжата подозрительно сильно "
+                                     f"({info.file_size // max(1, info.compress_size)}:1), возможна zip-бомба")
+            if unpacked > self.MAX_OOXML_UNPACKED:
+                raise ValueError(f"распакованный объем документа ({unpacked // 2**20} МБ) "
+                                 f"превышает {self.MAX_OOXML_UNPACKED // 2**20} МБ")
+            yield archive
+    
+    def _iter_ooxml_text(self, file_path, part_patterns):
+        """
+        Выдавать текст частей документа Office Open XML.
+        
+        Args:
+            file_path: Путь к файлу или двоичный поток
+            part_patterns: Шаблоны имен XML частей, в которых ищется текст
+        """
+        with self._open_ooxml(file_path) as archive:
+            for name in archive.namelist():
+                lower = name.lower()
+                if lower.endswith('.rels'):
+                    with archive.open(name) as part:
+                        yield from _iter_rels_targets(part)
+                elif any(fnmatch.fnmatchcase(lower, pattern) for pattern in part_patterns):
+                    with archive.open(name) as part:
+                        yield from _iter_ooxml_paragraphs(part)
+    
+    def iter_xlsx_text(self, file_path):
+        """
+        Выдавать строки .xlsx файла, читая XML внутри архива потоком.
+        
+        Сначала просматривается таблица общих строк (там почти всегда
+        хранится текст), затем листы, но только если в них есть строки,
+        записанные прямо в ячейках.
+        """
+        with self._open_ooxml(file_path) as archive:
+            names = archive.namelist()
+            for name in names:
+                if name.lower().endswith('sharedstrings.xml'):
+                    with archive.open(name) as part:
+                        yield from self._iter_xlsx_shared_strings(part)
+            
+            for name in names:
+                lower = name.lower()
+                if not (lower.startswith('xl/worksheets/') and lower.endswith('.xml')):
+                    continue
+                with archive.open(name) as part:
+                    if not _stream_contains(part, self.XLSX_INLINE_MARKERS):
+                        continue
+                with archive.open(name) as part:
+                    yield from self._iter_xlsx_inline_strings(part)
+    
+    @staticmethod
+    def _iter_xlsx_shared_strings(part):
+        """Выдавать элементы таблицы общих строк (sharedStrings.xml)."""
+        root = None
+        for event, elem in ElementTree.iterparse(part, events=('start', 'end')):
+            if root is None:
+                root = elem
+            elif event == 'end' and _local_name(elem.tag) == 'si':
+                yield ''.join(node.text or '' for node in elem.iter() if _local_name(node.tag) == 't')
+                root.clear()
+    
+    @staticmethod
+    def _iter_xlsx_inline_strings(part):
+        """Выдавать строки, записанные прямо в ячейках листа (inlineStr и результаты формул)."""
+        sheet_data = None
+        for event, elem in ElementTree.iterparse(part, events=('start', 'end')):
+            tag = _local_name(elem.tag)
+            if event == 'start':
+                if tag == 'sheetData':
+                    sheet_data = elem
+                continue
+            if tag == 'c':
+                cell_type = elem.get('t')
+                if cell_type == 'inlineStr':
+                    yield ''.join(node.text or '' for node in elem.iter() if _local_name(node.tag) == 't')
+                elif cell_type == 'str':
+                    yield ''.join(node.text or '' for node in elem if _local_name(node.tag) == 'v')
+            elif tag == 'row' and sheet_data is not None:
+                sheet_data.clear()
+    
+    def iter_xls_text(self, file_path):
+        """Выдавать значения ячеек .xls файла."""
+        with _open_source(file_path) as file:
+            workbook = xlrd.open_workbook(file_contents=file.read())
+        for sheet in workbook.sheets():
+            for row_idx in range(sheet.nrows):
+                for value in sheet.row_values(row_idx):
+                    if value:
+                        yield str(value)
+    
+    def iter_pptx_text(self, file_path):
+        """
+        Выдавать текст .pptx файла, читая XML внутри архива потоком.
+        
+        Кроме слайдов просматриваются заметки докладчика, примечания
+        и адреса гиперссылок из файлов .rels.
+        """
+        yield from self._iter_ooxml_text(file_path, self.PPTX_TEXT_PARTS)
+    
+    def iter_pdf_text(self, file_path):
+        """
+        Выдавать текст PDF файла.
+        
+        Сначала у каждой страницы проверяются распакованные потоки
+        содержимого: страницы, на которых адреса быть не может, не
+        разбираются. Адреса из ссылок (/URI, mailto:) берутся из аннотаций
+        напрямую. Остальные страницы при большом их количестве разбираются
+        параллельно в нескольких процессах.
+        """
+        if PDF_BACKEND == 'pdfminer':
+            yield from self._iter_pdfminer_text(file_path)
+            return
+        
+        with _open_source(file_path) as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            candidates = []
+            for index, page in enumerate(pdf_reader.pages):
+                yield from _pdf_link_uris(page)
+                if _pdf_page_may_contain_email(page):
+                    candidates.append(index)
+            
+            # Процессов больше, чем доступно процессоров, только замедляют разбор
+            workers = min(self.pdf_page_workers, _available_cpus())
+            if (workers > 1 and len(candidates) >= self.PDF_PARALLEL_MIN_PAGES
+                    and isinstance(file_path, (str, os.PathLike))):
+                yield from self._extract_pdf_pages_parallel(file_path, candidates, workers)
+                return
+            
+            for index in candidates:
+                yield pdf_reader.pages[index].extract_text()
+    
+    @staticmethod
+    def _extract_pdf_pages_parallel(file_path, pages, workers):
+        """Разобрать страницы PDF в общем пуле процессов; выдает найденные адреса."""
+        batch = -(-len(pages) // workers)
+        batches = [pages[i:i + batch] for i in range(0, len(pages), batch)]
+        pool = _pdf_page_pool(workers)
+        try:
+            for emails in pool.map(partial(_extract_pdf_pages, str(file_path)), batches):
+                yield from emails
+        except BrokenProcessPool:
+            # Процесс пула завершился аварийно: следующий PDF получит новый пул
+            shutdown_pdf_page_pool()
+            raise
+    
+    @staticmethod
+    def _iter_pdfminer_text(file_path):
+        """Выдавать текст страниц через pdfminer (если других библиотек нет)."""
+        with _open_source(file_path) as file:
+            for page_layout in pdfminer_high_level.extract_pages(file):
+                yield '\n'.join(
+                    element.get_text() for element in page_layout
+                    if isinstance(element, pdfminer_layout.LTTextContainer)
+                )
+    
+    def extract_from_docx(self, file_path):
+        """Извлечь email из .docx файла."""
+        try:
+            return self.extract_emails_from_fragments(self.iter_docx_text(file_path))
+        except Exception as e:
+            self.errors.append(f"Ошибка при обработке {_source_name(file_path)}: {str(e)}")
+            return set()
+    
+    def extract_from_xlsx(self, file_path):
+        """Извлечь email из .xlsx файла."""
+        try:
+            return self.extract_emails_from_fragments(self.iter_xlsx_text(file_path))
+        except Exception as e:
+            self.errors.append(f"Ошибка при обработке {_source_name(file_path)}: {str(e)}")
+            return set()
+    
+    def extract_from_xls(self, file_path):
+        """Извлечь email из .xls файла (старый формат)."""
+        try:
+            return self.extract_emails_from_fragments(self.iter_xls_text(file_path))
+        except Exception as e:
+            self.errors.append(f"Ошибка при обработке {_source_name(file_path)}: {str(e)}")
+            return set()
+    
+    def extract_from_pptx(self, file_path):
+        """Извлечь email из .pptx файла."""
+        try:
+            return self.extract_emails_from_fragments(self.iter_pptx_text(file_path))
+        except Exception as e:
+            self.errors.append(f"Ошибка при обработке {_source_name(file_path)}: {str(e)}")
+            return set()
+    
+    def extract_from_pdf(self, file_path):
+        """Извлечь email из PDF файла."""
+        try:
+            return self.extract_emails_from_fragments(self.iter_pdf_text(file_path))
+        except Exception as e:
+            self.errors.append(f"Ошибка при обработке {_source_name(file_path)}: {str(e)}")
+            return set()
+    
+    def extract_emails_from_bytes(self, data):
+        """
+        Извлечь email адреса из байтов без декодирования всего текста.
+        
+        Args:
+            data: Байты для поиска
+            
+        Returns:
+            Множество найденных email адресов
+        """
+        if not data:
+            return set()
+        started = time.perf_counter()
+        matches = _find_emails(data, b'@', self.EMAIL_PATTERN_BYTES, self.EMAIL_DOMAIN_PATTERN_BYTES,
+                               self.EMAIL_LOCAL_BYTES)
+        self.match_seconds += time.perf_counter() - started
+        self.text_length += len(data)
+        return {match.decode('ascii') for match in matches}
+    
+    def _email_safe_cut(self, data):
+        """
+        Найти место, где можно разрезать буфер, не разрывая email адрес.
+        
+        Возвращает позицию последнего байта, который не может входить в адрес;
+        все, что начинается с нее, переносится в следующий блок.
+        """
+        limit = max(0, len(data) - self.TEXT_CHUNK_OVERLAP)
+        position = len(data) - 1
+        while position >= limit and data[position] in self.EMAIL_BYTES:
+            position -= 1
+        return max(position, limit)
+    
+    def extract_from_txt(self, file_path):
+        """
+        Извлечь email из текстового файла.
+        
+        Файл читается блоками фиксированного размера; хвост блока, который
+        может быть началом адреса, переносится в следующий блок, поэтому
+        объем памяти не зависит от размера файла.
+        """
+        try:
+            emails = set()
+            tail = b''
+            with _open_source(file_path) as file:
+                while True:
+                    block = file.read(self.TEXT_CHUNK_SIZE)
+                    data = tail + block
+                    if not block:
+                        emails.update(self.extract_emails_from_bytes(data))
+                        return emails
+                    cut = self._email_safe_cut(data)
+                    emails.update(self.extract_emails_from_bytes(data[:cut]))
+                    tail = data[cut:]
+        except Exception as e:
+            self.errors.append(f"Ошибка при обработке {_source_name(file_path)}: {str(e)}")
+            return set()
+    
+    def extract_emails_from_utf16(self, data):
+        """
+        Извлечь email адреса из текста в кодировке UTF-16LE, записанного в байтах.
+        
+        Декодируются только цепочки печатных символов вокруг каждого @.
+        
+        Args:
+            data: Байты для поиска
+            
+        Returns:
+            Множество найденных email адресов
+        """
+        emails = set()
+        position = data.find(b'@\x00')
+        while position != -1:
+            start = position
+            while start >= 2 and data[start - 1] == 0 and 0x21 <= data[start - 2] <= 0x7e:
+                start -= 2
+            end = position + 2
+            while end + 1 < len(data) and data[end + 1] == 0 and 0x21 <= data[end] <= 0x7e:
+                end += 2
+            emails.update(self.extract_emails_from_text(data[start:end].decode('utf-16-le')))
+            position = data.find(b'@\x00', end)
+        return emails
+    
+    def extract_from_ole(self, file_path, stream_names):
+        """
+        Извлечь email из потоков составного файла OLE2 (старые форматы Office).
+        
+        Потоки просматриваются прямо в байтах: и как однобайтовый текст,
+        и как UTF-16LE. Если нужных потоков нет, просматриваются все.
+        Файлы, которые не являются OLE2 (например, RTF с расширением .doc),
+        читаются как обычный текст.
+        
+        Args:
+            file_path: Путь к файлу
+            stream_names: Имена потоков с текстом документа
+        """
+        try:
+            with _open_source(file_path) as file:
+                if file.read(len(OLE_SIGNATURE)) != OLE_SIGNATURE:
+                    return self.extract_from_txt(file_path)
+                file.seek(0)
+                ole = open_ole(file)
+                streams = [name for name in stream_names if name in ole.streams] or ole.streams
+                emails = set()
+                for name in streams:
+                    data = ole.read(name)
+                    emails.update(self.extract_emails_from_bytes(data))
+                    emails.update(self.extract_emails_from_utf16(data))
+                return emails
+        except Exception as e:
+            self.errors.append(f"Ошибка при обработке {_source_name(file_path)}: {str(e)}")
+            return set()
+    
+    def extract_from_doc(self, file_path):
+        """Извлечь email из .doc файла (старый формат)."""
+        return self.extract_from_ole(file_path, ['WordDocument'])
+    
+    def extract_from_ppt(self, file_path):
+        """Извлечь email из .ppt файла (старый формат)."""
+        return self.extract_from_ole(file_path, ['PowerPoint Document'])
+    
+    def supported_extensions(self):
+        """Расширения встроенных форматов и форматов из подключенных модулей (entry points)."""
+        return FORMATS.extensions(self.SUPPORTED_EXTENSIONS)
+    
+    def file_extension(self, file_path):
+        """Расширение файла в нижнем регистре (с учетом составных, например .tar.gz)."""
+        name = str(file_path).lower()
+        for extension in self.ARCHIVE_MULTI_EXTENSIONS:
+            if name.endswith(extension):
+                return extension
+        return os.path.splitext(name)[1]
+    
+    def extract_file(self, file_path, source=None):
+        """
+        Извлечь email адреса из файла, выбрав обработчик по расширению.
+        
+        Args:
+            file_path: Путь к файлу (по нему определяется формат)
+            source: Двоичный поток с содержимым файла, если файл уже в памяти
+            
+        Returns:
+            Множество найденных email адресов или None, если формат не поддерживается
+        """
+        if source is None:
+            source = Path(file_path)
+        
+        handler = FORMATS.handler(self.file_extension(file_path))
+        if handler is not None:
+            return handler(self, source)
+        
+        self.errors.append(f"Неподдерживаемый формат или отсутствует библиотека: {file_path}")
+        return None
+    
+    def extract_file_results(self, file_path, source=None, depth=0):
+        """
+        Извлечь email адреса из файла и всех вложенных в него файлов.
+        
+        Архивы, письма и встроенные в документы Office объекты разбираются
+        рекурсивно прямо из памяти. Вложенные файлы обозначаются как
+        «архив.zip!/папка/файл.docx».
+        
+        Args:
+            file_path: Путь к файлу (для вложенных — путь с «!/»)
+            source: Двоичный поток с содержимым, если файл уже в памяти
+            depth: Уровень вложенности
+            
+        Returns:
+            Список кортежей (путь, множество email или None, текст ошибки или None);
+            первый элемент относится к самому файлу
+        """
+        file_path = str(file_path)
+        ext = self.file_extension(file_path)
+        if source is None:
+            source = file_path
+        errors_before = len(self.errors)
+        members = []
+        
+        if ext in self.CONTAINER_EXTENSIONS:
+            emails = set()
+            members_source = self._iter_container_members(ext, source, emails)
+        else:
+            emails = self.extract_file(file_path, source)
+            members_source = ()
+            if ext in self.OOXML_EXTENSIONS and emails is not None:
+                members_source = self._iter_ooxml_embeddings(source)
+        
+        unpacked = 0
+        try:
+            for name, data in members_source:
+                member_path = f"{file_path}!/{name}"
+                unpacked += len(data)
+                if depth + 1 > self.MAX_CONTAINER_DEPTH:
+                    self.errors.append(f"Пропущен {member_path}: превышена глубина вложенности")
+                elif unpacked > self.MAX_CONTAINER_UNPACKED:
+                    self.errors.append(f"Пропущен {member_path}: превышен объем распакованных данных")
+                    break
+                else:
+                    buffer = io.BytesIO(data)
+                    buffer.name = member_path
+                    errors_before_member = len(self.errors)
+                    members.extend(self.extract_file_results(member_path, buffer, depth + 1))
+                    # Ошибки вложенного файла уже записаны в его собственный результат
+                    del self.errors[errors_before_member:]
+        except Exception as e:
+            self.errors.append(f"Ошибка при обработке {file_path}: {str(e)}")
+        
+        error = '\n'.join(self.errors[errors_before:]) or None
+        return [(file_path, emails, error)] + members
+    
+    def _read_member(self, name, size, read):
+        """
+        Прочитать элемент контейнера с проверкой размера.
+        
+        Returns:
+            Байты или None, если элемент больше MAX_MEMBER_SIZE
+        """
+        if size > self.MAX_MEMBER_SIZE:
+            self.errors.append(f"Пропущен {name}: размер больше {self.MAX_MEMBER_SIZE} байт")
+            return None
+        data = read(self.MAX_MEMBER_SIZE + 1)
+        if len(data) > self.MAX_MEMBER_SIZE:
+            self.errors.append(f"Пропущен {name}: размер больше {self.MAX_MEMBER_SIZE} байт")
+            return None
+        return data
+    
+    def _iter_container_members(self, ext, source, emails):
+        """Выдавать (имя, байты) поддерживаемых элементов контейнера."""
+        if ext == '.zip':
+            yield from self._iter_zip_members(source)
+        elif ext == '.eml':
+            yield from self._iter_eml_members(source, emails)
+        elif ext == '.msg':
+            yield from self._iter_msg_members(source, emails)
+        else:
+            yield from self._iter_tar_members(source)
+    
+    def _iter_zip_members(self, source):
+        """Выдавать поддерживаемые файлы из ZIP архива."""
+        with _open_source(source) as file, zipfile.ZipFile(file) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or self.file_extension(info.filename) not in self.supported_extensions():
+                    continue
+                with archive.open(info) as member:
+                    data = self._read_member(info.filename, info.file_size, member.read)
+                if data is not None:
+                    yield info.filename, data
+    
+    def _iter_tar_members(self, source):
+        """Выдавать поддерживаемые файлы из TAR архива (в том числе сжатого)."""
+        with _open_source(source) as file:
+            with tarfile.open(fileobj=file, mode='r|*') as archive:
+                for member in archive:
+                    if not member.isfile() or self.file_extension(member.name) not in self.supported_extensions():
+                        continue
+                    data = self._read_member(member.name, member.size, archive.extractfile(member).read)
+                    if data is not None:
+                        yield member.name, data
+    
+    def _iter_eml_members(self, source, emails):
+        """
+        Найти адреса в заголовках и тексте письма .eml и выдавать вложения.
+        
+        Args:
+            source: Путь или двоичный поток
+            emails: Множество, куда добавляются адреса из самого письма
+        """
+        with _open_source(source) as file:
+            message = message_from_binary_file(file, policy=email_policy.default)
+        
+        for index, part in enumerate(message.walk()):
+            emails.update(self.extract_emails_from_text(
+                '\n'.join(f"{key}: {value}" for key, value in part.items())
+            ))
+            if part.is_multipart():
+                continue
+            filename = part.get_filename()
+            payload = part.get_payload(decode=True) or b''
+            if filename:
+                if self.file_extension(filename) in self.supported_extensions():
+                    data = self._read_member(filename, len(payload), lambda size: payload)
+                    if data is not None:
+                        yield f"{index}/{filename}", data
+            elif part.get_content_maintype() == 'text':
+                charset = part.get_content_charset() or 'utf-8'
+                try:
+                    text = payload.decode(charset, errors='replace')
+                except LookupError:
+                    text = payload.decode('utf-8', errors='replace')
+                emails.update(self.extract_emails_from_text(text))
+    
+    def _iter_msg_members(self, source, emails):
+        """
+        Найти адреса в письме Outlook (.msg) и выдавать вложения.
+        
+        Все свойства письма, кроме содержимого вложений, просматриваются
+        как байты (однобайтовый текст и UTF-16LE).
+        """
+        with _open_source(source) as file:
+            ole = open_ole(file)
+            attachments = {}
+            for name in ole.streams:
+                storage, _, stream = name.rpartition('/')
+                if storage.startswith('__attach_version1.0_') and '/' not in storage:
+                    if stream == '__substg1.0_37010102':
+                        attachments.setdefault(storage, {})['data'] = name
+                        continue
+                    if stream in ('__substg1.0_3707001F', '__substg1.0_3704001F'):
+                        attachments.setdefault(storage, {})[stream] = name
+                data = ole.read(name)
+                emails.update(self.extract_emails_from_bytes(data))
+                emails.update(self.extract_emails_from_utf16(data))
+            
+            for storage, streams in sorted(attachments.items()):
+                # Длинное имя файла (3707) точнее короткого имени 8.3 (3704)
+                name = streams.get('__substg1.0_3707001F') or streams.get('__substg1.0_3704001F')
+                if 'data' not in streams or name is None:
+                    continue
+                filename = ole.read(name).decode('utf-16-le', errors='replace').rstrip('\x00')
+                if self.file_extension(filename) not in self.supported_extensions():
+                    continue
+                data = self._read_member(filename, 0, lambda limit: ole.read(streams['data']))
+                if data is not None:
+                    yield f"{storage}/{filename}", data
+    
+    def _iter_ooxml_embeddings(self, source):
+        """Выдавать документы, встроенные в .docx/.xlsx/.pptx (папка embeddings)."""
+        with _open_source(source) as file, zipfile.ZipFile(file) as archive:
+            for info in archive.infolist():
+                if '/embeddings/' not in info.filename or info.is_dir():
+                    continue
+                with archive.open(info) as member:
+                    data = self._read_member(info.filename, info.file_size, member.read)
+                if data is None:
+                    continue
+                if data[:len(OLE_SIGNATURE)] == OLE_SIGNATURE:
+                    yield from self._iter_ole_object(info.filename, data)
+                elif self.file_extension(info.filename) in self.supported_extensions():
+                    yield info.filename, data
+    
+    def _iter_ole_object(self, name, data):
+        """
+        Разобрать встроенный объект OLE и выдавать документ, который в нем хранится.
+        
+        Внутри может быть документ Office Open XML (поток Package), произвольный
+        файл (поток Ole10Native) или сам документ старого формата.
+        """
+        ole = open_ole(io.BytesIO(data))
+        if 'Package' in ole.streams:
+            package = ole.read('Package')
+            yield f"{name}/Package{_sniff_ooxml_extension(package)}", package
+        elif '\x01Ole10Native' in ole.streams:
+            filename, content = _parse_ole10native(ole.read('\x01Ole10Native'))
+            if self.file_extension(filename) in self.supported_extensions():
+                yield f"{name}/{filename}", content
+        elif 'WordDocument' in ole.streams:
+            yield f"{name}/WordDocument.doc", data
+        elif 'Workbook' in ole.streams or 'Book' in ole.streams:
+            yield f"{name}/Workbook.xls", data
+        elif 'PowerPoint Document' in ole.streams:
+            yield f"{name}/PowerPoint Document.ppt", data
+    
+    def process_file(self, file_path):
+        """
+        Обработать один файл и извлечь email адреса.
+        
+        Args:
+            file_path: Путь к файлу
+        """
+        self.handle_result(*_extract_worker(str(file_path), **self.worker_options()))
+    
+    def process_directory(self, directory, exclude_dirs=None, ignore_paths=()):
+        """
+        Обработать все файлы в директории.
+        
+        Args:
+            directory: Путь к директории или список таких путей
+            exclude_dirs: Шаблоны (glob) папок, которые нужно пропустить
+            ignore_paths: Файлы, которые не нужно обрабатывать (файлы
+                результатов, кэш, журнал самой программы)
+        """
+        self.processed_files = 0
+        self.found_emails = EmailIndex()
+        self.errors = []
+        self.profile = ScanProfile()
+        
+        self.update_status("Поиск файлов...")
+        files = self.iter_files(directory, exclude_dirs, ignore_paths)
+        if self.shard:
+            files = self.select_shard(files, directory)
         
-        for ext in self.SUPPORTED_EXTENSIONS.keys():
-            files.extend(directory.rglob(f'*{ext}'))
-            files.extend(directory.rglob(f'*{ext.upper()}'))
+        # При последовательной обработке без поиска копий файлы разбираются
+        # прямо во время обхода папок; пулу процессов и поиску копий нужен
+        # весь список заранее
+        streaming = self.workers == 1 and not self.dedup
+        if streaming:
+            self.total_files = 0
+            files = self._count_files(files)
+        else:
+            files = sorted(files)
+            self.total_files = len(files)
+            if self.total_files == 0:
+                self.update_status("Файлы не найдены!")
+                return
+            self.update_status(f"Найдено файлов: {self.total_files}. Начинаю обработку...")
+        
+        self.cache_hits = 0
+        self.cache_misses = 0
+        if self.cache_file:
+            self.cache = ScanCache(self.cache_file, use_hash=self.cache_hash)
         
-        return sorted(files)
+        self.duplicates = {}
+        self.duplicates_skipped = 0
+        self.duplicate_bytes = 0
+        self.journal_hits = 0
+        if self.journal_file:
+            self.journal = ScanJournal(self.journal_file, resume=self.resume)
+        
+        try:
+            if self.cache:
+                files = self.apply_cache(files)
+            if self.journal:
+                files = self.apply_journal(files)
+            if not streaming:
+                files = list(files)
+            if self.dedup:
+                files = self.deduplicate(files)
+            
+            if not streaming and self.workers > 1 and len(files) > 1:
+                self.process_files_parallel(files)
+            else:
+                for file_path, source in _iter_prefetched(files, **self.prefetch_options()):
+                    self.update_status(f"Обработка: {Path(file_path).name} ({self.processed_files + 1}/{self.total_files})")
+                    self.handle_result(*_extract_worker(str(file_path), source=source, **self.worker_options()))
+            # Порядок файлов в результатах не зависит от порядка обработки
+            self.found_emails.sort_postings()
+            
+            # Пустой обход не означает, что все файлы из кэша удалены (например, папка недоступна)
+            if self.cache and self.total_files:
+                # Файлы других частей этот запуск не видел, но удалять их из кэша нельзя
+                belongs = partial(self.in_shard, roots=_shard_roots(directory)) if self.shard else None
+                for root in _as_path_list(directory):
+                    self.cache.prune(root, belongs)
+        finally:
+            if self.cache:
+                self.cache.close()
+                self.cache = None
+            if self.journal:
+                self.journal.close()
+                self.journal = None
+            shutdown_pdf_page_pool()
+            self.profile.finish(self.cache_hits)
+        
+        if self.total_files == 0:
+            self.update_status("Файлы не найдены!")
+            return
+        
+        message = f"Обработка завершена! Найдено уникальных email: {len(self.found_emails)}"
+        if self.cache_file:
+            message += f" (из кэша: {self.cache_hits}, обработано заново: {self.cache_misses})"
+        if self.journal_hits:
+            message += f", из журнала прерванного запуска: {self.journal_hits}"
+        if self.dedup:
+            message += (f", пропущено копий: {self.duplicates_skipped}"
+                        f" ({self.duplicate_bytes / 2**20:.1f} МБ)")
+        self.update_status(message)
+    
+    def _count_files(self, files):
+        """Выдавать файлы обхода, считая их в self.total_files."""
+        for file_path in files:
+            self.total_files += 1
+            yield file_path
+    
+    def select_shard(self, files, directory):
+        """
+        Оставить только файлы своей части (self.shard).
+        
+        Часть определяется хэшем пути относительно папки поиска, поэтому
+        разбиение одинаково на всех узлах, даже если общая папка
+        подключена на них по разным путям.
+        
+        Args:
+            files: Пути к файлам (список или генератор обхода папок)
+            directory: Путь к директории или список таких путей
+            
+        Yields:
+            Файлы своей части
+        """
+        roots = _shard_roots(directory)
+        for file_path in files:
+            if self.in_shard(file_path, roots):
+                yield file_path
+    
+    def in_shard(self, file_path, roots):
+        """
+        Проверить, относится ли файл к своей части (self.shard).
+        
+        Args:
+            file_path: Путь к файлу
+            roots: Папки поиска (см. _shard_roots)
+        """
+        index, count = self.shard
+        absolute = os.path.abspath(file_path)
+        root = next((root for root in roots if absolute.startswith(root)), None)
+        relative = Path(os.path.relpath(absolute, root) if root else absolute).as_posix()
+        return _shard_of(relative, count) == index
+    
+    def apply_cache(self, files):
+        """
+        Взять из кэша результаты для неизмененных файлов.
+        
+        Args:
+            files: Пути к файлам (список или генератор обхода папок)
+            
+        Yields:
+            Файлы, которые нужно обработать заново
+        """
+        for file_path in files:
+            results = self.cache.lookup(file_path)
+            if results is None:
+                self.cache_misses += 1
+                yield file_path
+            else:
+                self.cache_hits += 1
+                self.handle_result(str(file_path), results)
+    
+    def apply_journal(self, files):
+        """
+        Взять из журнала прерванного запуска результаты уже обработанных файлов.
+        
+        Args:
+            files: Пути к файлам (список или генератор обхода папок)
+            
+        Yields:
+            Файлы, которые еще не обработаны
+        """
+        for file_path in files:
+            results = self.journal.completed.get(str(file_path))
+            if results is None:
+                yield file_path
+            else:
+                self.journal_hits += 1
+                self.handle_result(str(file_path), results)
+    
+    def deduplicate(self, files):
+        """
+        Оставить по одному файлу из каждой группы файлов с одинаковым содержимым.
+        
+        Файлы сначала группируются по размеру, хэш считается только для
+        файлов, размер которых совпал с размером другого файла. Пути копий
+        запоминаются в self.duplicates: результат разбора будет приписан и им.
+        
+        Args:
+            files: Список путей к файлам
+            
+        Returns:
+            Список файлов, которые нужно разобрать
+        """
+        sizes = {}
+        for file_path in files:
+            try:
+                sizes[file_path] = os.path.getsize(file_path)
+            except OSError:
+                pass
+        
+        counts = {}
+        for size in sizes.values():
+            counts[size] = counts.get(size, 0) + 1
+        candidates = [file_path for file_path, size in sizes.items() if counts[size] > 1]
+        self.update_status(f"Поиск одинаковых файлов среди {len(candidates)}...")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            hashes = dict(zip(candidates, executor.map(_content_hash, candidates)))
+        
+        unique = []
+        originals = {}
+        for file_path in files:
+            digest = hashes.get(file_path)
+            if digest is None:
+                unique.append(file_path)
+                continue
+            key = (sizes[file_path], digest)
+            original = originals.setdefault(key, str(file_path))
+            if original == str(file_path):
+                unique.append(file_path)
+            else:
+                self.duplicates.setdefault(original, []).append(str(file_path))
+                self.duplicates_skipped += 1
+                self.duplicate_bytes += sizes[file_path]
+        return unique
+    
+    def worker_options(self):
+        """Параметры обработки одного файла, передаваемые в _extract_worker."""
+        return {
+            'timeout': self.file_timeout,
+            'cprofile_dir': self.cprofile_dir,
+            'cprofile_formats': self.cprofile_formats,
+            # Внутри пула процессов страницы PDF параллельно не разбираются
+            'pdf_page_workers': self.pdf_page_workers if self.workers == 1 else 1,
+            'max_size': self.max_file_size,
+        }
+    
+    def prefetch_options(self):
+        """Параметры предварительного чтения файлов (см. _iter_prefetched)."""
+        return {'depth': self.prefetch, 'memory_budget': self.prefetch_memory}
+    
+    def handle_result(self, file_path, results, stats=None):
+        """
+        Принять результат обработки файла (из текущего или дочернего процесса).
+        
+        Args:
+            file_path: Путь к файлу
+            results: Список (путь, email адреса или None, ошибка или None): сам файл
+                и вложенные в него файлы
+            stats: Замеры обработки файла (см. _extract_worker) или None
+        """
+        if stats:
+            self.profile.add(file_path, stats)
+        
+        failed = False
+        for path, emails, error in results:
+            if error:
+                self.errors.append(error)
+                failed = True
+            if emails is not None:
+                self.found_emails.add(path, emails)
+            self.report_result(path, emails, error)
+        
+        # Копии файла получают тот же результат под своими путями
+        for duplicate in self.duplicates.pop(file_path, ()):
+            self.handle_result(duplicate, [
+                (duplicate + path[len(file_path):], emails, error.replace(file_path, duplicate) if error else None)
+                for path, emails, error in results
+            ])
+        
+        if self.journal and file_path not in self.journal.completed:
+            self.journal.record(file_path, results)
+        
+        # Неподдерживаемый файл не считается обработанным
+        if results[0][1] is None:
+            return
+        self.processed_files += 1
+        self.update_progress(self.processed_files, self.total_files)
+        if self.cache and not failed:
+            self.cache.store(file_path, results)
+    
+    def process_files_parallel(self, files):
+        """
+        Обработать файлы в пуле процессов.
+        
+        Файлы раздаются процессам пачками, начиная с самых крупных: большой
+        файл, доставшийся последним, задерживал бы весь запуск. Пачки
+        отправляются в пул, только пока суммарный размер файлов в обработке
+        не превышает memory_budget (одна пачка отправляется всегда). Обратно
+        возвращаются только кортежи (путь, результаты, замеры), которые
+        объединяются здесь.
+        
+        Если процесс пула аварийно завершился (нехватка памяти, сбой
+        библиотеки разбора), пул создается заново, а файлы пачек, которые
+        были в работе, обрабатываются по одному: в ошибки попадает только
+        файл, на котором процесс завершается и в одиночку. Так же
+        обрабатываются пачки, не вернувшиеся за время ожидания (единственная
+        защита от зависаний в Windows, где нет SIGALRM, и внутри кода на C):
+        пул перезапускается, а в ошибки попадает только файл, который
+        зависает и в одиночку.
+        
+        Args:
+            files: Список путей к файлам
+        """
+        sizes = {}
+        for file_path in map(str, files):
+            try:
+                sizes[file_path] = os.path.getsize(file_path)
+            except OSError:
+                sizes[file_path] = 0
+        paths = sorted(sizes, key=sizes.get, reverse=True)
+        
+        chunk_size = self.chunk_size or max(1, min(16, len(files) // (self.workers * 4)))
+        
+        def deadline(alone, started):
+            # Процесс обрабатывает пачку целиком, поэтому ждем не дольше,
+            # чем может занять самая медленная пачка
+            return started + self.file_timeout * (1 if alone else chunk_size) + 30
+        
+        # Каждому процессу должно хватать бюджета хотя бы на одну пачку
+        chunk_bytes = self.memory_budget // self.workers if self.memory_budget else None
+        chunks = deque()
+        for file_path in paths:
+            if (chunks and len(chunks[-1]) < chunk_size
+                    and (chunk_bytes is None or sum(sizes[path] for path in chunks[-1]) + sizes[file_path] <= chunk_bytes)):
+                chunks[-1].append(file_path)
+            else:
+                chunks.append([file_path])
+        pending = set(paths)
+        suspects = deque()  # файлы пачек, которые были в работе при аварии процесса или зависли
+        
+        def fail(chunk, message):
+            for file_path in chunk:
+                pending.discard(file_path)
+                for path in [file_path] + self.duplicates.pop(file_path, []):
+                    self.errors.append(f"Ошибка при обработке {path}: {message}")
+        
+        extract = partial(_extract_chunk, prefetch=self.prefetch_options(), **self.worker_options())
+        pool = None
+        # {future: (пачка, суммарный размер файлов, обрабатывается ли файл в одиночку, время отправки)};
+        # пачек в работе не больше, чем процессов, так что пачка начинает
+        # выполняться сразу после отправки
+        in_flight = {}
+        try:
+            while chunks or suspects or in_flight:
+                if pool is None:
+                    pool = concurrent.futures.ProcessPoolExecutor(
+                        min(self.workers, len(chunks) + len(suspects)),
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker, initargs=(self.worker_memory_limit,)
+                    )
+                
+                if suspects:
+                    # Подозрительные файлы обрабатываются строго по одному
+                    if not in_flight:
+                        chunk = [suspects.popleft()]
+                        in_flight[pool.submit(extract, chunk)] = (chunk, sizes[chunk[0]], True, time.monotonic())
+                else:
+                    while chunks and len(in_flight) < self.workers:
+                        chunk_total = sum(sizes[path] for path in chunks[0])
+                        used = sum(total for _, total, _, _ in in_flight.values())
+                        if in_flight and self.memory_budget and used + chunk_total > self.memory_budget:
+                            break
+                        chunk = chunks.popleft()
+                        in_flight[pool.submit(extract, chunk)] = (chunk, chunk_total, False, time.monotonic())
+                
+                timeout = None
+                if self.file_timeout:
+                    nearest = min(deadline(alone, started) for _, _, alone, started in in_flight.values())
+                    timeout = max(0.0, nearest - time.monotonic())
+                done, _ = concurrent.futures.wait(in_flight, timeout=timeout,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                if not done:
+                    # Пул перезапускается: файлы зависших пачек обрабатываются
+                    # по одному, остальные пачки отправляются заново
+                    now = time.monotonic()
+                    for chunk, _, alone, started in in_flight.values():
+                        if now >= deadline(alone, started):
+                            if alone:
+                                fail(chunk, "превышено время ожидания")
+                            else:
+                                suspects.extend(chunk)
+                        elif alone:
+                            suspects.appendleft(chunk[0])
+                        else:
+                            chunks.appendleft(chunk)
+                    in_flight.clear()
+                    _terminate_pool(pool)
+                    pool = None
+                    continue
+                
+                broken = False
+                if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                    # После аварии пула все пачки в работе завершаются с BrokenProcessPool
+                    done = list(in_flight)
+                for future in done:
+                    chunk, _, alone, _ = in_flight.pop(future)
+                    try:
+                        chunk_results = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        if alone:
+                            fail(chunk, "процесс обработки аварийно завершился")
+                        else:
+                            suspects.extend(chunk)
+                        continue
+                    except Exception as e:
+                        # Пачка не вернулась целиком (например, не хватило памяти при передаче результата)
+                        fail(chunk, str(e))
+                        continue
+                    
+                    for file_path, results, stats in chunk_results:
+                        pending.discard(file_path)
+                        self.update_status(f"Обработка: {Path(file_path).name} ({self.processed_files + 1}/{self.total_files})")
+                        self.handle_result(file_path, results, stats)
+                
+                if broken:
+                    pool.shutdown(wait=True)
+                    pool = None
+        finally:
+            if pool is not None and in_flight:
+                _terminate_pool(pool)
+            elif pool is not None:
+                # Все задачи завершены; остановка без ожидания в Python 3.8-3.9
+                # приводит к ошибке при выходе из программы
+                pool.shutdown(wait=True)
+    
+    def apply_changes(self, changed, removed):
+        """
+        Обновить результаты после изменений в файловой системе.
+        
+        Args:
+            changed: Созданные или измененные файлы (обрабатываются заново)
+            removed: Удаленные файлы или папки (их адреса убираются из результатов)
+        """
+        self.found_emails.remove_paths(set(map(str, changed)) | set(map(str, removed)))
+        for file_path in sorted(map(str, changed)):
+            if not os.path.isfile(file_path):
+                continue
+            self.update_status(f"Обработка: {Path(file_path).name}")
+            self.handle_result(*_extract_worker(file_path, **self.worker_options()))
+        self.found_emails.sort_postings()
+        self.update_status(
+            f"Обновлено файлов: {len(changed)}, удалено: {len(removed)}. "
+            f"Уникальных email: {len(self.found_emails)}"
+        )
+    
+    def watch(self, directories, exclude_dirs=None, flush=None, debounce=1.0,
+              max_delay=10.0, flush_interval=5.0, polling=False, poll_interval=2.0,
+              stop_event=None, ignore_paths=()):
+        """
+        Следить за папками и обновлять результаты по мере изменения файлов.
+        
+        События накапливаются, пока файлы не перестанут меняться debounce
+        секунд (но не дольше max_delay), затем обрабатываются одной пачкой.
+        Результаты сохраняются вызовом flush не чаще раза в flush_interval
+        секунд. Используется inotify (Linux, только локальные папки), иначе
+        периодический обход папок.
+        
+        Args:
+            directories: Путь к папке или список путей
+            exclude_dirs: Шаблоны (glob) папок, которые нужно пропустить
+            flush: Функция без аргументов, сохраняющая результаты, или None
+            debounce: Пауза без событий перед обработкой (секунды)
+            max_delay: Наибольшая задержка обработки при непрерывных событиях
+            flush_interval: Наименьший интервал между сохранениями
+            polling: Не использовать inotify
+            poll_interval: Интервал обхода папок без inotify
+            stop_event: threading.Event для остановки (по умолчанию — до Ctrl+C)
+            ignore_paths: Файлы, изменения которых не учитываются (например,
+                сами файлы результатов, если они лежат в отслеживаемой папке)
+        """
+        ignore_paths = {_normalized_path(path) for path in ignore_paths}
+        watcher = None
+        if not polling:
+            try:
+                watcher = InotifyWatcher(self, directories, exclude_dirs)
+            except OSError as e:
+                self.update_status(f"inotify не используется: {e}")
+        if watcher is None:
+            watcher = PollingWatcher(self, directories, exclude_dirs, poll_interval)
+        self.update_status(f"Слежение за изменениями ({watcher.NAME})...")
+        
+        changed, removed = set(), set()
+        first_event = last_event = None
+        last_flush = time.monotonic()
+        dirty = False
+        try:
+            while not (stop_event and stop_event.is_set()):
+                new_changed, new_removed = (
+                    {path for path in paths if _normalized_path(path) not in ignore_paths}
+                    for paths in watcher.read_events(timeout=0.5)
+                )
+                now = time.monotonic()
+                if new_changed or new_removed:
+                    changed -= new_removed
+                    removed -= new_changed
+                    changed |= new_changed
+                    removed |= new_removed
+                    first_event = first_event or now
+                    last_event = now
+                
+                if first_event and (now - last_event >= debounce or now - first_event >= max_delay):
+                    self.apply_changes(changed, removed)
+                    changed, removed = set(), set()
+                    first_event = last_event = None
+                    dirty = True
+                
+                if dirty and flush and now - last_flush >= flush_interval:
+                    flush()
+                    dirty = False
+                    last_flush = now
+        finally:
+            watcher.close()
+            if dirty and flush:
+                flush()
+    
+    def save_partial(self, output_file):
+        """
+        Сохранить результаты одной части в компактный файл (JSON, сжатый gzip).
+        
+        Файл содержит таблицу путей, номера путей для каждого адреса и
+        ошибки; несколько таких файлов объединяются merge_partials.
+        
+        Args:
+            output_file: Путь к выходному файлу
+        """
+        paths, postings = self.found_emails.to_lists()
+        data = {
+            'format': self.PARTIAL_FORMAT,
+            'version': self.PARTIAL_VERSION,
+            'shard': list(self.shard) if self.shard else None,
+            'total_files': self.total_files,
+            'processed_files': self.processed_files,
+            'paths': paths,
+            'postings': postings,
+            'errors': self.errors,
+        }
+        with gzip.open(output_file, 'wt', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
+    
+    def merge_partials(self, partial_files):
+        """
+        Объединить результаты частей, сохраненные save_partial.
+        
+        Args:
+            partial_files: Пути к файлам частей
+            
+        Returns:
+            Номера недостающих частей (с нуля); пустой список, если есть все
+            
+        Raises:
+            ValueError: Если файл не является файлом части, части получены при
+                разном количестве частей или одна часть передана дважды
+        """
+        self.found_emails = EmailIndex()
+        self.errors = []
+        self.processed_files = 0
+        self.total_files = 0
+        
+        shard_count = None
+        seen = set()
+        for partial_file in partial_files:
+            self.update_status(f"Объединение: {Path(partial_file).name}")
+            try:
+                with gzip.open(partial_file, 'rt', encoding='utf-8') as file:
+                    data = json.load(file)
+            except (gzip.BadGzipFile, EOFError, json.JSONDecodeError) as e:
+                raise ValueError(f"{partial_file} поврежден или не является файлом результатов части: {str(e)}")
+            if not isinstance(data, dict) or data.get('format') != self.PARTIAL_FORMAT:
+                raise ValueError(f"{partial_file} не является файлом результатов части")
+            if data.get('version') != self.PARTIAL_VERSION:
+                raise ValueError(f"{partial_file}: неподдерживаемая версия формата {data.get('version')}")
+            
+            if data['shard'] is not None:
+                index, count = data['shard']
+                if shard_count is not None and count != shard_count:
+                    raise ValueError(f"{partial_file}: часть из {count}, а остальные — из {shard_count}")
+                if index in seen:
+                    raise ValueError(f"{partial_file}: часть {index + 1}/{count} передана повторно")
+                shard_count = count
+                seen.add(index)
+            
+            self.found_emails.merge(EmailIndex.from_lists(data['paths'], data['postings']))
+            self.errors.extend(data['errors'])
+            self.processed_files += data['processed_files']
+            self.total_files += data['total_files']
+        
+        # Порядок файлов в результатах не зависит от порядка частей
+        self.found_emails.sort_postings()
+        missing = sorted(set(range(shard_count)) - seen) if shard_count else []
+        message = f"Объединено частей: {len(partial_files)}. Уникальных email: {len(self.found_emails)}"
+        if missing:
+            message += f". Нет частей: {', '.join(f'{index + 1}/{shard_count}' for index in missing)}"
+        self.update_status(message)
+        return missing
+    
+    def save_to_csv(self, output_file):
+        """
+        Сохранить результаты в CSV файл.
+        
+        Args:
+            output_file: Путь к выходному файлу
+        """
+        with open(output_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['Email адрес', 'Количество файлов', 'Файлы'])
+            
+            # Список файлов собирается для одной строки за раз, а не для всего индекса
+            for email in sorted(self.found_emails):
+                files = self.found_emails[email]
+                writer.writerow([email, len(files), '; '.join(files)])
+    
+    def save_to_excel(self, output_file):
+        """
+        Сохранить результаты в Excel файл.
+        
+        Книга записывается потоком (write-only). Если строк больше, чем
+        помещается на листе Excel, создаются дополнительные листы; список
+        файлов обрезается до предельной длины ячейки.
+        
+        Args:
+            output_file: Путь к выходному файлу
+        """
+        if not XLSX_AVAILABLE:
+            raise ImportError("openpyxl не установлен. Используйте CSV формат.")
+        
+        Workbook = openpyxl.Workbook
+        get_column_letter = openpyxl.utils.get_column_letter
+        wb = Workbook(write_only=True)
+        header = ['Email адрес', 'Количество файлов', 'Файлы']
+        emails = sorted(self.found_emails)
+        rows_per_sheet = self.EXCEL_MAX_ROWS - 1
+        
+        for sheet_index, offset in enumerate(range(0, max(len(emails), 1), rows_per_sheet), 1):
+            title = "Найденные email" if sheet_index == 1 else f"Найденные email ({sheet_index})"
+            ws = wb.create_sheet(title)
+            sheet_emails = emails[offset:offset + rows_per_sheet]
+            
+            # Ширина столбцов задается до записи строк, поэтому считаем ее по длинам
+            # значений, не собирая сами строки
+            widths = [len(name) for name in header]
+            for email in sheet_emails:
+                files = self.found_emails[email]
+                widths[0] = max(widths[0], len(email))
+                widths[1] = max(widths[1], len(str(len(files))))
+                if widths[2] < self.EXCEL_MAX_COLUMN_WIDTH:
+                    widths[2] = max(widths[2], len(self._excel_files_cell(files)))
+            for column, width in enumerate(widths, 1):
+                ws.column_dimensions[get_column_letter(column)].width = min(width + 2, self.EXCEL_MAX_COLUMN_WIDTH)
+            
+            ws.append(header)
+            for email in sheet_emails:
+                files = self.found_emails[email]
+                ws.append([email, len(files), self._excel_files_cell(files)])
+        
+        wb.save(output_file)
+    
+    def _excel_files_cell(self, files):
+        """Список файлов для ячейки Excel, обрезанный до допустимой длины ячейки."""
+        files_str = '; '.join(files)
+        if len(files_str) <= self.EXCEL_MAX_CELL_LENGTH:
+            return files_str
+        
+        parts = []
+        length = 0
+        for file_path in files:
+            # Оставляем место для разделителя и пометки об остатке
+            if length + len(file_path) + 2 > self.EXCEL_MAX_CELL_LENGTH - 40:
+                break
+            parts.append(file_path)
+            length += len(file_path) + 2
+        note = f"... (еще {len(files) - len(parts)} файл(ов), полный список в CSV)"
+        return '; '.join(parts + [note])
+
+
+class FormatRegistry:
+    """
+    Соответствие расширений файлов обработчикам форматов.
+    
+    Обработчик — функция handler(extractor, source), возвращающая множество
+    адресов. Библиотеки формата импортируются только при первом вызове
+    обработчика. Сторонние пакеты добавляют форматы через entry points
+    группы ENTRY_POINT_GROUP: имя — расширение, значение — функция-обработчик,
+    например в pyproject.toml:
+    
+        [project.entry-points."find_emails.formats"]
+        ".rtf" = "find_emails_rtf:extract_from_rtf"
+    
+    Список entry points читается при первом обращении, сами модули
+    подключаемых пакетов — при первом файле с их расширением.
+    """
+    
+    ENTRY_POINT_GROUP = 'find_emails.formats'
+    
+    def __init__(self):
+        self._handlers = {}
+        self._entry_points = None
+    
+    def register(self, extension, handler, available=True):
+        """
+        Зарегистрировать обработчик формата.
+        
+        Args:
+            extension: Расширение с точкой в нижнем регистре, например '.pdf'
+            handler: Функция handler(extractor, source)
+            available: Установлены ли библиотеки, нужные обработчику
+        """
+        if available:
+            self._handlers[extension] = handler
+    
+    def handler(self, extension):
+        """Обработчик для расширения или None, если формат не поддерживается."""
+        handler = self._handlers.get(extension)
+        if handler is None:
+            entry_point = self._plugin_entry_points().pop(extension, None)
+            if entry_point is not None:
+                handler = self._handlers[extension] = entry_point.load()
+        return handler
+    
+    def extensions(self, builtin):
+        """Встроенные расширения и расширения из entry points."""
+        return set(builtin) | set(self._plugin_entry_points()) | set(self._handlers)
+    
+    def _plugin_entry_points(self):
+        """Еще не загруженные entry points подключаемых форматов {расширение: entry point}."""
+        if self._entry_points is None:
+            self._entry_points = {}
+            entry_points = importlib_metadata.entry_points()
+            if hasattr(entry_points, 'select'):
+                entry_points = entry_points.select(group=self.ENTRY_POINT_GROUP)
+            else:  # Python 3.8-3.9
+                entry_points = entry_points.get(self.ENTRY_POINT_GROUP, ())
+            for entry_point in entry_points:
+                name = entry_point.name.lower()
+                extension = name if name.startswith('.') else f".{name}"
+                if extension not in self._handlers:
+                    self._entry_points[extension] = entry_point
+        return self._entry_points
+
+
+FORMATS = FormatRegistry()
+FORMATS.register('.docx', EmailExtractor.extract_from_docx)
+FORMATS.register('.doc', EmailExtractor.extract_from_doc)
+FORMATS.register('.xlsx', EmailExtractor.extract_from_xlsx)
+FORMATS.register('.xls', EmailExtractor.extract_from_xls, XLS_AVAILABLE)
+FORMATS.register('.pptx', EmailExtractor.extract_from_pptx)
+FORMATS.register('.ppt', EmailExtractor.extract_from_ppt)
+FORMATS.register('.pdf', EmailExtractor.extract_from_pdf, PDF_AVAILABLE)
+for _extension in EmailExtractor.TEXT_EXTENSIONS:
+    FORMATS.register(_extension, EmailExtractor.extract_from_txt)
+
+
+class EmailIndex(Mapping):
+    """
+    Компактный индекс «email -> файлы».
+    
+    Пути к файлам хранятся один раз и заменяются целыми номерами, а для
+    каждого адреса хранится массив array('I') с номерами файлов. Снаружи
+    индекс ведет себя как словарь {email: [список файлов]}.
+    """
+    
+    def __init__(self):
+        self.paths = []  # номер -> путь
+        self.path_ids = {}  # путь -> номер
+        self.postings = {}  # email -> array('I') с номерами путей
+    
+    def intern_path(self, file_path):
+        """Получить номер пути, добавив его при необходимости."""
+        file_path = str(file_path)
+        path_id = self.path_ids.get(file_path)
+        if path_id is None:
+            path_id = len(self.paths)
+            self.paths.append(file_path)
+            self.path_ids[file_path] = path_id
+        return path_id
+    
+    def add(self, file_path, emails):
+        """
+        Добавить адреса, найденные в одном файле.
+        
+        Args:
+            file_path: Путь к файлу
+            emails: Найденные email адреса (регистр не важен)
+        """
+        emails = {email.lower() for email in emails}
+        if not emails:
+            return
+        path_id = self.intern_path(file_path)
+        for email in emails:
+            postings = self.postings.get(email)
+            if postings is None:
+                postings = self.postings[email] = array('I')
+            postings.append(path_id)
+    
+    def remove_paths(self, file_paths):
+        """
+        Удалить файлы из индекса вместе со всем, что в них вложено.
+        
+        Удаляются сам путь, файлы внутри архива («путь!/...») и, если путь —
+        папка, все файлы в ней. Адреса, которые остались без файлов,
+        удаляются из индекса. Номера удаленных путей не используются повторно.
+        
+        Args:
+            file_paths: Пути к файлам или папкам
+            
+        Returns:
+            Количество удаленных путей
+        """
+        file_paths = {str(file_path) for file_path in file_paths}
+        if not file_paths:
+            return 0
+        prefixes = tuple(
+            prefix for file_path in file_paths
+            for prefix in (f"{file_path}!/", os.path.join(file_path, ''))
+        )
+        removed = {
+            path_id for path, path_id in self.path_ids.items()
+            if path in file_paths or path.startswith(prefixes)
+        }
+        if not removed:
+            return 0
+        
+        for email in list(self.postings):
+            postings = self.postings[email]
+            kept = array('I', (path_id for path_id in postings if path_id not in removed))
+            if not kept:
+                del self.postings[email]
+            elif len(kept) != len(postings):
+                self.postings[email] = kept
+        for path_id in removed:
+            del self.path_ids[self.paths[path_id]]
+            self.paths[path_id] = None
+        return len(removed)
+    
+    def merge(self, other):
+        """
+        Добавить результаты другого индекса (например, от другого процесса или узла).
+        
+        Args:
+            other: EmailIndex
+        """
+        # Удаленные пути (None) ни в одном массиве не встречаются
+        mapping = array('I', (self.intern_path(file_path) if file_path is not None else 0
+                              for file_path in other.paths))
+        for email, postings in other.postings.items():
+            target = self.postings.get(email)
+            if target is None:
+                target = self.postings[email] = array('I')
+            target.extend(mapping[path_id] for path_id in postings)
+    
+    def sort_postings(self):
+        """Упорядочить файлы каждого адреса по пути."""
+        for email, postings in self.postings.items():
+            self.postings[email] = array('I', sorted(postings, key=self.paths.__getitem__))
+    
+    def to_lists(self):
+        """
+        Представить индекс простыми списками (для сохранения в JSON).
+        
+        Удаленные пути в таблицу не попадают, номера путей сжимаются.
+        
+        Returns:
+            Кортеж (список путей, {email: [номера путей]})
+        """
+        paths = []
+        mapping = {}
+        for path_id, file_path in enumerate(self.paths):
+            if file_path is not None:
+                mapping[path_id] = len(paths)
+                paths.append(file_path)
+        postings = {email: [mapping[path_id] for path_id in ids] for email, ids in self.postings.items()}
+        return paths, postings
+    
+    @classmethod
+    def from_lists(cls, paths, postings):
+        """Восстановить индекс из списков, полученных to_lists."""
+        index = cls()
+        for file_path in paths:
+            index.intern_path(file_path)
+        for email, ids in postings.items():
+            index.postings[email] = array('I', ids)
+        return index
+    
+    def file_count(self, email):
+        """Количество файлов, в которых найден адрес."""
+        return len(self.postings[email])
+    
+    def __getitem__(self, email):
+        return [self.paths[path_id] for path_id in self.postings[email]]
+    
+    def __iter__(self):
+        return iter(self.postings)
+    
+    def __len__(self):
+        return len(self.postings)
+    
+    def __contains__(self, email):
+        return email in self.postings
+
+
+class ScanCache:
+    """
+    Кэш результатов обработки файлов в SQLite.
+    
+    Файл считается неизмененным, если совпадают путь, размер и время
+    изменения (mtime_ns). При use_hash дополнительно сравнивается хэш
+    содержимого, так что файл с новым mtime, но прежним содержимым
+    повторно не обрабатывается.
+    """
+    
+    SCHEMA_VERSION = 2
+    COMMIT_EVERY = 500
+    
+    def __init__(self, cache_file, use_hash=False):
+        """
+        Открыть (или создать) кэш.
+        
+        Args:
+            cache_file: Путь к файлу базы данных
+            use_hash: Использовать хэш содержимого
+        """
+        self.use_hash = use_hash
+        self.run_id = time.time_ns()
+        self.connection = sqlite3.connect(os.fspath(cache_file))
+        self._pending = {}  # {путь: (size, mtime_ns, hash)} для файлов, которых нет в кэше
+        self._seen = []
+        self._changes = 0
+        
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.SCHEMA_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS files")
+            self.connection.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+            "hash TEXT, results TEXT, seen INTEGER)"
+        )
+    
+    @staticmethod
+    def file_hash(file_path):
+        """Посчитать хэш содержимого файла."""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def lookup(self, file_path):
+        """
+        Найти сохраненный результат для файла.
+        
+        Args:
+            file_path: Путь к файлу
+            
+        Returns:
+            Список результатов (путь, email адреса, None) или None, если файл
+            нужно обработать заново
+        """
+        key = os.path.abspath(file_path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, hash, results FROM files WHERE path = ?", (key,)
+        ).fetchone()
+        
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            self._seen.append((self.run_id, key))
+            return self._decode(file_path, row[3])
+        
+        content_hash = None
+        if self.use_hash:
+            try:
+                content_hash = self.file_hash(file_path)
+            except OSError:
+                return None
+            if row and row[0] == stat.st_size and row[2] == content_hash:
+                self.connection.execute(
+                    "UPDATE files SET mtime_ns = ?, seen = ? WHERE path = ?",
+                    (stat.st_mtime_ns, self.run_id, key)
+                )
+                self._changed()
+                return self._decode(file_path, row[3])
+        
+        self._pending[key] = (stat.st_size, stat.st_mtime_ns, content_hash)
+        return None
+    
+    def store(self, file_path, results):
+        """
+        Сохранить результат обработки файла.
+        
+        Args:
+            file_path: Путь к файлу
+            results: Список (путь, email адреса, ошибка): сам файл и вложенные файлы
+        """
+        key = os.path.abspath(file_path)
+        stat = self._pending.pop(key, None)
+        if stat is None:
+            return
+        size, mtime_ns, content_hash = stat
+        # Пути вложенных файлов хранятся относительно самого файла («!/...»)
+        prefix = str(file_path)
+        encoded = [[path[len(prefix):], sorted(emails)] for path, emails, _ in results]
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, hash, results, seen) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, size, mtime_ns, content_hash, json.dumps(encoded), self.run_id)
+        )
+        self._changed()
+    
+    @staticmethod
+    def _decode(file_path, value):
+        """Восстановить список результатов из записи кэша."""
+        prefix = str(file_path)
+        return [(prefix + suffix, emails, None) for suffix, emails in json.loads(value)]
+    
+    def prune(self, directory, belongs=None):
+        """
+        Удалить записи о файлах из директории, которые не встретились при этом запуске.
+        
+        Args:
+            directory: Обработанная директория
+            belongs: Функция path -> bool, отбирающая файлы, которые этот запуск
+                должен был встретить (например, файлы своей части), или None — все
+            
+        Returns:
+            Количество удаленных записей
+        """
+        self._flush_seen()
+        prefix = os.path.join(os.path.abspath(directory), '')
+        if belongs is None:
+            cursor = self.connection.execute(
+                "DELETE FROM files WHERE substr(path, 1, ?) = ? AND seen != ?",
+                (len(prefix), prefix, self.run_id)
+            )
+            removed = cursor.rowcount
+        else:
+            stale = [
+                (path,) for (path,) in self.connection.execute(
+                    "SELECT path FROM files WHERE substr(path, 1, ?) = ? AND seen != ?",
+                    (len(prefix), prefix, self.run_id)
+                )
+                if belongs(path)
+            ]
+            self.connection.executemany("DELETE FROM files WHERE path = ?", stale)
+            removed = len(stale)
+        self.connection.commit()
+        return removed
+    
+    def close(self):
+        """Записать изменения и закрыть базу данных."""
+        self._flush_seen()
+        self.connection.commit()
+        self.connection.close()
+    
+    def _flush_seen(self):
+        """Отметить файлы, взятые из кэша, как встреченные при этом запуске."""
+        if self._seen:
+            self.connection.executemany("UPDATE files SET seen = ? WHERE path = ?", self._seen)
+            self._seen = []
+    
+    def _changed(self):
+        """Периодически фиксировать транзакцию."""
+        self._changes += 1
+        if self._changes % self.COMMIT_EVERY == 0:
+            self.connection.commit()
+
+
+class ScanJournal:
+    """
+    Журнал обработанных файлов для продолжения прерванного запуска.
+    
+    Записи копятся в памяти и раз в FLUSH_INTERVAL секунд (или по
+    MAX_PENDING записей) пишутся одной строкой: JSON-массивом пар
+    [путь файла, результаты (включая вложенные файлы и ошибки)]. Так на
+    каждый файл не тратится отдельный вызов json.dumps и запись в файл.
+    Файл только дописывается, поэтому при сбое теряются результаты только
+    последних секунд работы.
+    """
+    
+    FLUSH_INTERVAL = 5.0
+    MAX_PENDING = 10000
+    
+    def __init__(self, journal_file, resume=False):
+        """
+        Открыть журнал.
+        
+        Args:
+            journal_file: Путь к файлу журнала
+            resume: Прочитать записи прерванного запуска и дописывать после них;
+                иначе журнал начинается заново
+        """
+        self.completed = self.load(journal_file) if resume else {}
+        self.file = open(journal_file, 'a' if resume else 'w', encoding='utf-8')
+        self.pending = []
+        # Последняя строка могла остаться недописанной
+        if self.file.tell() > 0:
+            self.file.write('\n')
+        self.last_flush = time.monotonic()
+    
+    @staticmethod
+    def load(journal_file):
+        """
+        Прочитать журнал.
+        
+        Returns:
+            Словарь {путь: список результатов (путь, email адреса, ошибка)}
+        """
+        completed = {}
+        try:
+            with open(journal_file, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entries = json.loads(line)
+                    except ValueError:
+                        continue  # строка, оборванная при сбое
+                    if isinstance(entries, dict):
+                        # Журнал прежней версии: по строке на файл
+                        entries = [(entries['file'], entries['results'])]
+                    for file_path, results in entries:
+                        completed[file_path] = [tuple(result) for result in results]
+        except FileNotFoundError:
+            pass
+        return completed
+    
+    def record(self, file_path, results):
+        """
+        Записать результат обработки файла.
+        
+        Args:
+            file_path: Путь к файлу
+            results: Список (путь, список email адресов или None, ошибка или None)
+        """
+        self.pending.append((file_path, results))
+        if len(self.pending) >= self.MAX_PENDING or time.monotonic() - self.last_flush >= self.FLUSH_INTERVAL:
+            self.flush()
+    
+    def flush(self):
+        """Записать накопленные записи одной строкой и сбросить файл на диск."""
+        if self.pending:
+            # Записи — простые списки без циклических ссылок, их проверка только замедляет json
+            self.file.write(json.dumps(self.pending, ensure_ascii=False, check_circular=False) + '\n')
+            self.pending = []
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_flush = time.monotonic()
+    
+    def close(self):
+        """Сбросить записанное на диск и закрыть журнал."""
+        self.flush()
+        self.file.close()
+
+
+def _shard_roots(directory):
+    """Папки поиска для определения части: вложенные проверяются раньше родительских."""
+    return sorted((os.path.join(os.path.abspath(root), '') for root in _as_path_list(directory)),
+                  key=len, reverse=True)
+
+
+def _shard_of(relative_path, count):
+    """
+    Номер части (с нуля), к которой относится файл.
+    
+    Args:
+        relative_path: Путь относительно папки поиска с разделителями «/»
+        count: Количество частей
+    """
+    digest = hashlib.blake2b(relative_path.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count
+
+
+def _as_path_list(paths):
+    """Привести путь или список путей к списку."""
+    if isinstance(paths, (str, os.PathLike)):
+        return [paths]
+    return list(paths)
+
+
+def _available_cpus():
+    """Количество процессоров, доступных этому процессу."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _normalized_path(path):
+    """Абсолютный путь в форме, пригодной для сравнения путей между собой."""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _source_name(source):
+    """Имя файла или потока для сообщений об ошибках."""
+    if isinstance(source, (str, os.PathLike)):
+        return str(source)
+    return getattr(source, 'name', repr(source))
+
+
+def _content_hash(file_path, block_size=1024 * 1024):
+    """
+    Посчитать быстрый хэш содержимого файла (xxhash, если установлен, иначе blake2b).
+    
+    Returns:
+        Хэш в виде строки или None, если файл не удалось прочитать
+    """
+    digest = xxhash.xxh3_128() if XXHASH_AVAILABLE else hashlib.blake2b(digest_size=16)
+    try:
+        with _open_path(file_path) as file:
+            for block in iter(lambda: file.read(block_size), b''):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _open_path(path):
+    """
+    Открыть файл для чтения в двоичном режиме.
+    
+    Все обработчики форматов открывают файлы только через эту функцию
+    (замеры с медленной файловой системой подменяют именно ее).
+    """
+    return open(path, 'rb')
+
+
+@contextmanager
+def _open_source(source):
+    """Открыть путь для чтения в двоичном режиме или вернуть уже открытый поток с начала."""
+    if isinstance(source, (str, os.PathLike)):
+        with _open_path(source) as file:
+            yield file
+    else:
+        source.seek(0)
+        yield source
+
+
+def _sniff_ooxml_extension(data):
+    """Определить тип документа Office Open XML по содержимому архива."""
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            names = set(archive.namelist())
+    except zipfile.BadZipFile:
+        return '.bin'
+    if 'word/document.xml' in names:
+        return '.docx'
+    if 'xl/workbook.xml' in names:
+        return '.xlsx'
+    if 'ppt/presentation.xml' in names:
+        return '.pptx'
+    return '.zip'
+
+
+def _parse_ole10native(data):
+    """
+    Разобрать поток Ole10Native встроенного объекта.
+    
+    Returns:
+        Кортеж (имя файла, содержимое)
+    """
+    position = 6  # размер потока (4 байта) и флаги (2 байта)
+    end = data.index(b'\x00', position)
+    filename = data[position:end].decode('latin-1')
+    position = data.index(b'\x00', end + 1) + 1  # исходный путь
+    position += 4  # служебное поле 00 00 03 00
+    temp_length = struct.unpack_from('<I', data, position)[0]
+    position += 4 + temp_length
+    size = struct.unpack_from('<I', data, position)[0]
+    position += 4
+    return os.path.basename(filename.replace('\\', '/')), data[position:position + size]
+
+
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+
+class OleCompoundFile:
+    """
+    Чтение потоков из составного файла OLE2 (.doc, .ppt, .xls, .msg).
+    
+    Читаются только заголовок, таблицы размещения, каталог и запрошенные
+    потоки; файл целиком в память не загружается.
+    """
+    
+    FREE_SECTOR = 0xFFFFFFFF
+    END_OF_CHAIN = 0xFFFFFFFE
+    NO_STREAM = 0xFFFFFFFF
+    
+    def __init__(self, file):
+        """
+        Args:
+            file: Двоичный файл, открытый для чтения
+        """
+        self.file = file
+        header = file.read(512)
+        if header[:8] != OLE_SIGNATURE:
+            raise ValueError("файл не является составным документом OLE2")
+        
+        self.sector_size = 1 << struct.unpack_from('<H', header, 0x1E)[0]
+        self.mini_sector_size = 1 << struct.unpack_from('<H', header, 0x20)[0]
+        (fat_count, directory_start, _, self.mini_cutoff, mini_fat_start, mini_fat_count,
+         difat_start, difat_count) = struct.unpack_from('<8I', header, 0x2C)
+        file.seek(0, os.SEEK_END)
+        self.max_sectors = max(1, file.tell() // self.sector_size)
+        
+        # Таблица размещения (FAT): первые 109 секторов указаны в заголовке, остальные — в цепочке DIFAT
+        fat_sectors = list(struct.unpack_from('<109I', header, 0x4C))
+        per_sector = self.sector_size // 4 - 1
+        sector = difat_start
+        for _ in range(difat_count):
+            if sector >= self.END_OF_CHAIN:
+                break
+            entries = struct.unpack(f'<{per_sector + 1}I', self._read_sector(sector))
+            fat_sectors.extend(entries[:per_sector])
+            sector = entries[per_sector]
+        self.fat = []
+        for sector in fat_sectors[:fat_count]:
+            data = self._read_sector(sector)
+            self.fat.extend(struct.unpack(f'<{len(data) // 4}I', data))
+        
+        directory = self._read_chain(directory_start)
+        self.entries = [directory[i:i + 128] for i in range(0, len(directory) - 127, 128)]
+        
+        root = self._parse_entry(0)
+        self.mini_stream = self._read_chain(root['start'], root['size']) if root['size'] else b''
+        mini_fat = self._read_chain(mini_fat_start) if mini_fat_count else b''
+        self.mini_fat = list(struct.unpack(f'<{len(mini_fat) // 4}I', mini_fat))
+        
+        self.paths = {}
+        self._walk(root['child'], '', set())
+        self.streams = sorted(self.paths)
+    
+    def _read_sector(self, sector):
+        """Прочитать один сектор."""
+        self.file.seek((sector + 1) * self.sector_size)
+        return self.file.read(self.sector_size)
+    
+    def _chain(self, start, table, limit):
+        """Номера секторов цепочки, начиная со start."""
+        sector = start
+        for _ in range(limit):
+            if sector >= self.END_OF_CHAIN or sector >= len(table):
+                return
+            yield sector
+            sector = table[sector]
+    
+    def _read_chain(self, start, size=None):
+        """Прочитать цепочку обычных секторов."""
+        data = b''.join(self._read_sector(sector) for sector in self._chain(start, self.fat, self.max_sectors))
+        return data if size is None else data[:size]
+    
+    def _parse_entry(self, index):
+        """Разобрать запись каталога."""
+        entry = self.entries[index]
+        name_length = struct.unpack_from('<H', entry, 64)[0]
+        left, right, child = struct.unpack_from('<3I', entry, 68)
+        start, size = struct.unpack_from('<IQ', entry, 116)
+        if self.sector_size == 512:
+            size &= 0xFFFFFFFF
+        return {
+            'name': entry[:max(0, name_length - 2)].decode('utf-16-le', errors='replace'),
+            'type': entry[66],
+            'left': left,
+            'right': right,
+            'child': child,
+            'start': start,
+            'size': size,
+        }
+    
+    def _walk(self, index, prefix, visited):
+        """Обойти дерево каталога и запомнить полные имена потоков."""
+        stack = [(index, prefix)]
+        while stack:
+            index, prefix = stack.pop()
+            if index == self.NO_STREAM or index >= len(self.entries) or index in visited:
+                continue
+            visited.add(index)
+            entry = self._parse_entry(index)
+            stack.append((entry['left'], prefix))
+            stack.append((entry['right'], prefix))
+            path = prefix + entry['name']
+            if entry['type'] == 2:
+                self.paths[path] = entry
+            elif entry['type'] == 1:
+                stack.append((entry['child'], path + '/'))
+    
+    def read(self, name):
+        """
+        Прочитать поток целиком.
+        
+        Args:
+            name: Полное имя потока (вложенные хранилища разделяются '/')
+        """
+        entry = self.paths[name]
+        if entry['size'] >= self.mini_cutoff:
+            return self._read_chain(entry['start'], entry['size'])
+        chunks = []
+        for sector in self._chain(entry['start'], self.mini_fat, len(self.mini_fat)):
+            offset = sector * self.mini_sector_size
+            chunks.append(self.mini_stream[offset:offset + self.mini_sector_size])
+        return b''.join(chunks)[:entry['size']]
+
+
+class _OlefileAdapter:
+    """Тот же интерфейс, что у OleCompoundFile, поверх библиотеки olefile."""
+    
+    def __init__(self, file):
+        self.ole = olefile.OleFileIO(file)
+        self.streams = sorted('/'.join(path) for path in self.ole.listdir(streams=True, storages=False))
+    
+    def read(self, name):
+        return self.ole.openstream(name).read()
+
+
+def open_ole(file):
+    """Открыть составной файл OLE2 (через olefile, если библиотека установлена)."""
+    if OLEFILE_AVAILABLE:
+        return _OlefileAdapter(file)
+    return OleCompoundFile(file)
+
+
+def _find_emails(data, at_sign, pattern, domain_pattern, local_chars):
+    """
+    Найти email адреса, запуская регулярное выражение только рядом с символами @.
+    
+    Результат совпадает с pattern.findall(data): для каждого @ сначала
+    проверяется часть адреса после него, затем ищется самое левое начало
+    адреса в непрерывной цепочке допустимых символов перед @.
+    Работает и со строками, и с байтами.
+    
+    Args:
+        data: Строка или байты
+        at_sign: '@' того же типа, что и data
+        pattern: Полное регулярное выражение адреса
+        domain_pattern: Регулярное выражение части адреса, начиная с @
+        local_chars: Символы, допустимые перед @
+        
+    Returns:
+        Список найденных адресов в порядке появления
+    """
+    matches = []
+    last_end = 0
+    position = data.find(at_sign)
+    while position != -1:
+        if domain_pattern.match(data, position):
+            start = position
+            while start > last_end and data[start - 1] in local_chars:
+                start -= 1
+            for candidate in range(start, position):
+                match = pattern.match(data, candidate)
+                if match:
+                    matches.append(match.group())
+                    last_end = match.end()
+                    break
+        position = data.find(at_sign, max(position + 1, last_end))
+    return matches
+
+
+# Признаки того, что в потоке содержимого страницы PDF может быть @: сам символ,
+# его восьмеричная запись в строке и ссылки mailto
+PDF_EMAIL_MARKERS = (b'@', b'\\100', b'mailto')
+PDF_HEX_STRING = re.compile(rb'<[0-9A-Fa-f\s]+>')
+
+# Стандартные 14 шрифтов PDF: для них без /Encoding действует известная
+# кодировка, в которой @ — байт 0x40
+PDF_STANDARD_FONTS = frozenset((
+    '/Courier', '/Courier-Bold', '/Courier-Oblique', '/Courier-BoldOblique',
+    '/Helvetica', '/Helvetica-Bold', '/Helvetica-Oblique', '/Helvetica-BoldOblique',
+    '/Times-Roman', '/Times-Bold', '/Times-Italic', '/Times-BoldItalic',
+    '/Symbol', '/ZapfDingbats',
+))
+
+
+def _pdf_page_may_contain_email(page):
+    """
+    Проверить по сырому потоку содержимого, может ли на странице быть адрес.
+    
+    Для простых шрифтов со стандартной кодировкой символ @ записывается
+    в потоке как есть (или как \\100), поэтому страницу без этих байтов
+    можно не разбирать. Если на странице есть шестнадцатеричные строки,
+    вложенные формы или шрифт, у которого @ может быть записан другим
+    байтом, страница разбирается всегда (см. _pdf_font_may_remap).
+    """
+    contents = page.get_contents()
+    if contents is None:
+        return False
+    data = contents.get_data()
+    if any(marker in data for marker in PDF_EMAIL_MARKERS):
+        return True
+    if PDF_HEX_STRING.search(data):
+        return True
+    
+    resources = page.get('/Resources')
+    resources = resources.get_object() if resources is not None else {}
+    xobjects = resources.get('/XObject')
+    if xobjects is not None:
+        for xobject in xobjects.get_object().values():
+            if xobject.get_object().get('/Subtype') == '/Form':
+                return True
+    fonts = resources.get('/Font')
+    if fonts is not None:
+        for font in fonts.get_object().values():
+            if _pdf_font_may_remap(font.get_object()):
+                return True
+    return False
+
+
+def _pdf_font_may_remap(font):
+    """
+    Проверить, может ли шрифт кодировать символ @ не байтом 0x40.
+    
+    Так бывает у составных шрифтов (Type0) и Type3, у шрифтов с таблицей
+    /ToUnicode или собственной кодировкой (/Differences), у встроенных
+    шрифтов (/FontFile*) и у нестандартных шрифтов без /Encoding: их
+    встроенная кодировка может быть любой.
+    """
+    if font.get('/Subtype') in ('/Type0', '/Type3'):
+        return True
+    if font.get('/ToUnicode') is not None:
+        return True
+    descriptor = font.get('/FontDescriptor')
+    if descriptor is not None:
+        descriptor = descriptor.get_object()
+        if any(key in descriptor for key in ('/FontFile', '/FontFile2', '/FontFile3')):
+            return True
+    encoding = font.get('/Encoding')
+    if encoding is None:
+        return font.get('/BaseFont') not in PDF_STANDARD_FONTS
+    return not isinstance(encoding.get_object(), str)
+
+
+def _pdf_link_uris(page):
+    """Выдавать адреса ссылок (/URI) из аннотаций страницы PDF."""
+    annotations = page.get('/Annots')
+    if annotations is None:
+        return
+    for annotation in annotations.get_object():
+        action = annotation.get_object().get('/A')
+        if action is None:
+            continue
+        uri = action.get_object().get('/URI')
+        if uri:
+            yield unquote(str(uri))
+
+
+def _local_name(tag):
+    """Имя XML элемента без пространства имен."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _iter_ooxml_paragraphs(part):
+    """
+    Выдавать текст абзацев XML части документа Office Open XML.
+    
+    Фрагменты текста одного абзаца (w:t, a:t) склеиваются, табуляции
+    и переносы строк заменяются пробельными символами, как в python-docx.
+    Текст примечаний PowerPoint (p:text) и инструкции полей Word
+    (w:instrText, например HYPERLINK "mailto:...") выдаются отдельно.
+    
+    Разобранные элементы удаляются из дерева, поэтому память не растет
+    с размером документа.
+    """
+    ancestors = []  # открытые элементы: тело документа, таблица, строка, ячейка...
+    for event, elem in ElementTree.iterparse(part, events=('start', 'end')):
+        if event == 'start':
+            ancestors.append(elem)
+            continue
+        ancestors.pop()
+        tag = _local_name(elem.tag)
+        if tag == 'p':
+            parts = []
+            for node in elem.iter():
+                node_tag = _local_name(node.tag)
+                if node_tag == 't':
+                    parts.append(node.text or '')
+                elif node_tag == 'tab':
+                    parts.append('\t')
+                elif node_tag in ('br', 'cr'):
+                    parts.append('\n')
+            if parts:
+                yield ''.join(parts)
+            # Вложенные абзацы (надписи, ячейки) не попадут во внешний повторно
+            elem.clear()
+        elif tag in ('text', 'instrText'):
+            if elem.text:
+                yield elem.text
+            elem.clear()
+        else:
+            continue
+        # Внутри абзаца предков очищать нельзя: его текст еще не выдан
+        if not any(_local_name(ancestor.tag) == 'p' for ancestor in ancestors):
+            for ancestor in ancestors:
+                ancestor.clear()
+
+
+def _iter_rels_targets(part):
+    """Выдавать адреса ссылок (Target) из файла связей .rels."""
+    for event, elem in ElementTree.iterparse(part):
+        if _local_name(elem.tag) == 'Relationship' and elem.get('TargetMode') == 'External':
+            yield unquote(elem.get('Target', ''))
+
+
+def _stream_contains(stream, markers, block_size=1024 * 1024):
+    """Проверить, встречается ли в двоичном потоке хотя бы одна из подстрок."""
+    overlap = max(len(marker) for marker in markers) - 1
+    tail = b''
+    for block in iter(lambda: stream.read(block_size), b''):
+        data = tail + block
+        if any(marker in data for marker in markers):
+            return True
+        tail = data[-overlap:]
+    return False
+
+
+class PollingWatcher:
+    """Поиск изменений периодическим обходом папок (работает на любой системе)."""
     
-    def extract_emails_from_text(self, text):
+    NAME = "обход папок"
+    
+    def __init__(self, extractor, directories, exclude_dirs=None, interval=2.0):
+        self.extractor = extractor
+        self.directories = directories
+        self.exclude_dirs = exclude_dirs
+        self.interval = interval
+        self.snapshot = self._snapshot()
+        self.next_scan = time.monotonic() + interval
+    
+    def _snapshot(self):
+        """Состояние файлов {путь: (размер, время изменения)}."""
+        snapshot = {}
+        for file_path in self.extractor.iter_files(self.directories, self.exclude_dirs):
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            snapshot[str(file_path)] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+    
+    def read_events(self, timeout):
         """
-        Извлечь email адреса из текста.
+        Дождаться очередного обхода (не дольше timeout) и сравнить с предыдущим.
         
-        Args:
-            text: Текст для поиска
-            
         Returns:
-            Множество найденных email адресов
+            Кортеж (измененные или новые файлы, удаленные файлы)
         """
-        if not text:
-            return set()
-        return set(self.EMAIL_PATTERN.findall(text))
+        delay = self.next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set(), set()
+        time.sleep(max(0.0, delay))
+        self.next_scan = time.monotonic() + self.interval
+        
+        snapshot = self._snapshot()
+        changed = {path for path, state in snapshot.items() if self.snapshot.get(path) != state}
+        removed = set(self.snapshot) - set(snapshot)
+        self.snapshot = snapshot
+        return changed, removed
     
-    def extract_from_docx(self, file_path):
-        """Извлечь email из .docx файла."""
-        try:
-            doc = Document(file_path)
-            text = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-            # Также проверяем таблицы
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += '\n' + cell.text
-            return self.extract_emails_from_text(text)
-        except Exception as e:
-            self.errors.append(f"Ошибка при обработке {file_path}: {str(e)}")
-            return set()
+    def close(self):
+        pass
+
+
+# Файловые системы, изменения на которых inotify видит только от этого компьютера
+NETWORK_FILESYSTEMS = frozenset({
+    'cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', 'ceph', 'glusterfs', 'lustre', 'gpfs',
+    'afs', '9p', 'fuse.sshfs', 'fuse.rclone', 'fuse.davfs',
+})
+
+
+def _network_filesystems(path, mountinfo='/proc/self/mountinfo'):
+    """
+    Сетевые файловые системы, на которых лежит папка или ее подпапки.
     
-    def extract_from_xlsx(self, file_path):
-        """Извлечь email из .xlsx файла."""
-        try:
-            workbook = openpyxl.load_workbook(file_path, data_only=True)
-            text = ''
-            for sheet in workbook.worksheets:
-                for row in sheet.iter_rows(values_only=True):
-                    for cell in row:
-                        if cell:
-                            text += str(cell) + '\n'
-            return self.extract_emails_from_text(text)
-        except Exception as e:
-            self.errors.append(f"Ошибка при обработке {file_path}: {str(e)}")
-            return set()
+    Args:
+        path: Путь к папке
+        mountinfo: Таблица точек монтирования (Linux)
+        
+    Returns:
+        Множество типов файловых систем (пустое, если таблица недоступна)
+    """
+    path = os.path.realpath(path).rstrip('/') + '/'
+    try:
+        with open(mountinfo, encoding='utf-8', errors='surrogateescape') as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return set()
     
-    def extract_from_xls(self, file_path):
-        """Извлечь email из .xls файла (старый формат)."""
-        try:
-            workbook = xlrd.open_workbook(file_path)
-            text = ''
-            for sheet in workbook.sheets():
-                for row_idx in range(sheet.nrows):
-                    for col_idx in range(sheet.ncols):
-                        cell = sheet.cell(row_idx, col_idx)
-                        if cell.value:
-                            text += str(cell.value) + '\n'
-            return self.extract_emails_from_text(text)
-        except Exception as e:
-            self.errors.append(f"Ошибка при обработке {file_path}: {str(e)}")
-            return set()
+    found = set()
+    containing = ('', None)  # самая глубокая точка монтирования, содержащая папку
+    for line in lines:
+        fields, _, rest = line.partition(' - ')
+        fields, rest = fields.split(), rest.split()
+        if len(fields) < 5 or not rest:
+            continue
+        # Пробелы и другие служебные символы в пути записаны как \040
+        mount_point = re.sub(r'\\([0-7]{3})', lambda match: chr(int(match.group(1), 8)), fields[4])
+        mount_point = mount_point.rstrip('/') + '/'
+        if path.startswith(mount_point):
+            if len(mount_point) >= len(containing[0]):
+                containing = (mount_point, rest[0])
+        elif mount_point.startswith(path) and rest[0] in NETWORK_FILESYSTEMS:
+            found.add(rest[0])
+    if containing[1] in NETWORK_FILESYSTEMS:
+        found.add(containing[1])
+    return found
+
+
+class InotifyWatcher:
+    """
+    Поиск изменений через inotify (Linux), без внешних библиотек.
     
-    def extract_from_pptx(self, file_path):
-        """Извлечь email из .pptx файла."""
-        try:
-            prs = Presentation(file_path)
-            text = ''
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text += shape.text + '\n'
-                    # Проверяем таблицы
-                    if shape.has_table:
-                        for row in shape.table.rows:
-                            for cell in row.cells:
-                                text += cell.text + '\n'
-            return self.extract_emails_from_text(text)
-        except Exception as e:
-            self.errors.append(f"Ошибка при обработке {file_path}: {str(e)}")
-            return set()
+    Каждая папка отслеживается отдельно; новые папки добавляются по мере
+    появления. При переполнении очереди событий папки обходятся заново.
+    Для сетевых папок (SMB, NFS) не используется: изменения, сделанные
+    с других компьютеров, inotify не видит.
+    """
     
-    def extract_from_pdf(self, file_path):
-        """Извлечь email из PDF файла."""
-        try:
-            text = ''
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + '\n'
-            return self.extract_emails_from_text(text)
-        except Exception as e:
-            self.errors.append(f"Ошибка при обработке {file_path}: {str(e)}")
-            return set()
+    NAME = "inotify"
     
-    def extract_from_txt(self, file_path):
-        """Извлечь email из текстового файла."""
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                text = file.read()
-            return self.extract_emails_from_text(text)
-        except Exception as e:
-            self.errors.append(f"Ошибка при обработке {file_path}: {str(e)}")
-            return set()
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+                  | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+    EVENT_HEADER = struct.Struct('iIII')
     
-    def extract_from_doc(self, file_path):
-        """Извлечь email из .doc файла (старый формат)."""
-        # Для старых .doc файлов нужны дополнительные библиотеки
-        # Пытаемся прочитать как текстовый файл (может не сработать)
+    def __init__(self, extractor, directories, exclude_dirs=None):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify доступен только в Linux")
+        self.extractor = extractor
+        self.roots = [os.fspath(root) for root in _as_path_list(directories)]
+        for root in self.roots:
+            network = _network_filesystems(root)
+            if network:
+                raise OSError(f"{root} находится в сетевой файловой системе ({', '.join(sorted(network))}), "
+                              f"изменения с других компьютеров inotify не видит")
+        self.exclude_dirs = list(exclude_dirs or [])
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.watches = {}  # дескриптор -> папка
         try:
-            return self.extract_from_txt(file_path)
-        except:
-            self.errors.append(f"Не удалось обработать {file_path}: требуется дополнительная библиотека для .doc файлов")
-            return set()
-    
-    def extract_from_ppt(self, file_path):
-        """Извлечь email из .ppt файла (старый формат)."""
-        # Для старых .ppt файлов нужны дополнительные библиотеки
-        self.errors.append(f"Не удалось обработать {file_path}: требуется дополнительная библиотека для .ppt файлов")
-        return set()
+            for root in self.roots:
+                self._add_tree(root)
+        except OSError:
+            self.close()
+            raise
     
-    def process_file(self, file_path):
+    def _add_tree(self, directory):
         """
-        Обработать один файл и извлечь email адреса.
+        Начать следить за папкой и всеми вложенными папками.
         
-        Args:
-            file_path: Путь к файлу
+        Returns:
+            Поддерживаемые файлы, которые уже лежат в этих папках
         """
-        file_path = Path(file_path)
-        ext = file_path.suffix.lower()
-        
-        emails = set()
-        
-        if ext == '.docx' and DOCX_AVAILABLE:
-            emails = self.extract_from_docx(file_path)
-        elif ext == '.doc':
-            emails = self.extract_from_doc(file_path)
-        elif ext == '.xlsx' and XLSX_AVAILABLE:
-            emails = self.extract_from_xlsx(file_path)
-        elif ext == '.xls' and XLS_AVAILABLE:
-            emails = self.extract_from_xls(file_path)
-        elif ext == '.pptx' and PPTX_AVAILABLE:
-            emails = self.extract_from_pptx(file_path)
-        elif ext == '.ppt':
-            emails = self.extract_from_ppt(file_path)
-        elif ext == '.pdf' and PDF_AVAILABLE:
-            emails = self.extract_from_pdf(file_path)
-        elif ext == '.txt':
-            emails = self.extract_from_txt(file_path)
-        else:
-            self.errors.append(f"Неподдерживаемый формат или отсутствует библиотека: {file_path}")
-            return
+        files = set()
+        for current, subdirs, names in os.walk(directory):
+            subdirs[:] = [
+                name for name in subdirs
+                if not any(fnmatch.fnmatch(name, pattern)
+                           or fnmatch.fnmatch(os.path.join(current, name).replace(os.sep, '/'), pattern)
+                           for pattern in self.exclude_dirs)
+            ]
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(current), self.WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                raise OSError(error, f"{os.strerror(error)}: {current}")
+            self.watches[wd] = current
+            files.update(
+                os.path.join(current, name) for name in names
+                if self.extractor.is_supported_file(name)
+            )
+        return files
+    
+    def _forget_tree(self, directory):
+        """Перестать следить за папкой, которая удалена или перемещена."""
+        prefix = os.path.join(directory, '')
+        for wd, path in list(self.watches.items()):
+            if path == directory or path.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+    
+    def read_events(self, timeout):
+        """
+        Дождаться событий (не дольше timeout) и разобрать их.
         
-        # Сохраняем найденные email адреса
-        for email in emails:
-            email_lower = email.lower()
-            if email_lower not in self.found_emails:
-                self.found_emails[email_lower] = []
-            self.found_emails[email_lower].append(str(file_path))
+        Returns:
+            Кортеж (измененные или новые файлы, удаленные файлы или папки)
+        """
+        changed, removed = set(), set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed, removed
+        try:
+            data = os.read(self.fd, 1024 * 1024)
+        except BlockingIOError:
+            return changed, removed
         
-        self.processed_files += 1
-        self.update_progress(self.processed_files, self.total_files)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\x00'))
+            offset += length
+            
+            if mask & self.IN_Q_OVERFLOW:
+                # Часть событий потеряна: обрабатываем все папки заново
+                removed.update(self.roots)
+                for root in self.roots:
+                    self._forget_tree(root)
+                    changed.update(self._add_tree(root))
+                continue
+            if mask & self.IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    if not any(fnmatch.fnmatch(name, pattern) for pattern in self.exclude_dirs):
+                        changed.update(self._add_tree(path))
+                elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                    self._forget_tree(path)
+                    removed.add(path)
+            elif self.extractor.is_supported_file(name):
+                if mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                    removed.add(path)
+                    changed.discard(path)
+                elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE):
+                    changed.add(path)
+                    removed.discard(path)
+        return changed, removed
+    
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class ScanProfile:
+    """
+    Замеры времени обработки: сводка по форматам и самые медленные файлы.
+    
+    Для каждого файла учитываются формат, размер, время разбора документа,
+    время поиска адресов, объем текста и количество найденных адресов.
+    Сами записи не накапливаются: хранятся только суммы по форматам и
+    N самых медленных файлов.
+    """
+    
+    SLOWEST_COUNT = 20
     
-    def process_directory(self, directory):
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall_seconds = 0.0
+        self.cache_hits = 0
+        self.formats = {}
+        self._slowest = []  # куча (время, путь, замеры)
+    
+    def add(self, file_path, stats):
         """
-        Обработать все файлы в директории.
+        Учесть замеры обработки одного файла.
         
         Args:
-            directory: Путь к директории
+            file_path: Путь к файлу
+            stats: Словарь с ключами format, size, parse_seconds, match_seconds, text_length, emails
         """
-        self.update_status("Поиск файлов...")
-        files = self.find_files(directory)
-        self.total_files = len(files)
+        totals = self.formats.setdefault(stats['format'], {
+            'files': 0, 'bytes': 0, 'parse_seconds': 0.0, 'match_seconds': 0.0,
+            'text_length': 0, 'emails': 0,
+        })
+        totals['files'] += 1
+        totals['bytes'] += stats['size']
+        totals['parse_seconds'] += stats['parse_seconds']
+        totals['match_seconds'] += stats['match_seconds']
+        totals['text_length'] += stats['text_length']
+        totals['emails'] += stats['emails']
         
-        if self.total_files == 0:
-            self.update_status("Файлы не найдены!")
-            return
-        
-        self.update_status(f"Найдено файлов: {self.total_files}. Начинаю обработку...")
-        self.processed_files = 0
-        self.found_emails = {}
-        self.errors = []
-        
-        for i, file_path in enumerate(files, 1):
-            self.update_status(f"Обработка: {file_path.name} ({i}/{self.total_files})")
-            self.process_file(file_path)
-        
-        self.update_status(f"Обработка завершена! Найдено уникальных email: {len(self.found_emails)}")
+        seconds = stats['parse_seconds'] + stats['match_seconds']
+        entry = (seconds, str(file_path), stats)
+        if len(self._slowest) < self.SLOWEST_COUNT:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
     
-    def save_to_csv(self, output_file):
+    def finish(self, cache_hits=0):
+        """Зафиксировать общее время работы."""
+        self.wall_seconds = time.perf_counter() - self.started
+        self.cache_hits = cache_hits
+    
+    def report(self):
+        """Сформировать отчет в виде словаря."""
+        formats = {}
+        for extension, totals in sorted(self.formats.items()):
+            seconds = totals['parse_seconds'] + totals['match_seconds']
+            formats[extension] = dict(
+                totals,
+                mb_per_second=round(totals['bytes'] / 2**20 / seconds, 3) if seconds else None,
+                files_per_second=round(totals['files'] / seconds, 3) if seconds else None,
+            )
+        slowest = [
+            dict(stats, file=file_path, seconds=round(seconds, 6))
+            for seconds, file_path, stats in sorted(self._slowest, key=lambda entry: entry[:2], reverse=True)
+        ]
+        return {
+            'wall_seconds': round(self.wall_seconds, 3),
+            'files': sum(totals['files'] for totals in self.formats.values()),
+            'cache_hits': self.cache_hits,
+            'formats': formats,
+            'slowest': slowest,
+        }
+    
+    def save(self, output_file):
         """
-        Сохранить результаты в CSV файл.
+        Сохранить отчет в JSON.
         
         Args:
             output_file: Путь к выходному файлу
         """
-        with open(output_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['Email адрес', 'Количество файлов', 'Файлы'])
-            
-            for email, files in sorted(self.found_emails.items()):
-                files_str = '; '.join(files)
-                writer.writerow([email, len(files), files_str])
+        with open(output_file, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, ensure_ascii=False, indent=2)
+
+
+@contextmanager
+def _time_limit(seconds):
+    """Прервать обработку файла по истечении времени (только там, где есть SIGALRM)."""
+    if (not seconds or not hasattr(signal, 'setitimer')
+            or threading.current_thread() is not threading.main_thread()):
+        yield
+        return
     
-    def save_to_excel(self, output_file):
+    def on_timeout(signum, frame):
+        raise ProcessingTimeout(f"превышено время обработки ({seconds} с)")
+    
+    previous = signal.signal(signal.SIGALRM, on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class ProcessingTimeout(BaseException):
+    """
+    Превышено время обработки файла.
+    
+    Наследуется от BaseException, чтобы обработчики форматов, которые
+    перехватывают Exception, не могли проглотить прерывание.
+    """
+
+
+def _extract_worker(file_path, timeout=None, cprofile_dir=None, cprofile_formats=None,
+                    pdf_page_workers=1, source=None, max_size=None):
+    """
+    Обработать файл в дочернем процессе.
+    
+    Args:
+        file_path: Путь к файлу
+        timeout: Ограничение времени обработки (секунды)
+        cprofile_dir: Папка, куда сохранить профиль cProfile, или None
+        cprofile_formats: Расширения, для которых нужен профиль (None — все)
+        pdf_page_workers: Количество процессов для разбора страниц PDF
+        source: Содержимое файла, заранее прочитанное в память, или None
+        max_size: Предельный размер файла (байты); более крупный файл не разбирается
+    
+    Returns:
+        Кортеж (путь, результаты, замеры); результаты — список
+        (путь, список email или None, текст ошибки или None) для самого файла
+        и вложенных в него файлов; замеры равны None, если файл не разбирался
+    """
+    extractor = EmailExtractor(pdf_page_workers=pdf_page_workers)
+    extension = extractor.file_extension(file_path)
+    try:
+        size = source.getbuffer().nbytes if source is not None else os.path.getsize(file_path)
+    except OSError:
+        size = 0
+    
+    profiler = None
+    if cprofile_dir and (not cprofile_formats or extension in cprofile_formats):
+        profiler = cProfile.Profile()
+    
+    if max_size and size > max_size:
+        error = f"Ошибка при обработке {file_path}: размер файла ({size} байт) превышает предел ({max_size} байт)"
+        return (file_path, [(file_path, None, error)], None)
+    
+    started = time.perf_counter()
+    try:
+        with _time_limit(timeout):
+            if profiler:
+                profiler.enable()
+            try:
+                results = extractor.extract_file_results(file_path, source)
+            finally:
+                if profiler:
+                    profiler.disable()
+    except ProcessingTimeout as e:
+        results = [(file_path, None, f"Ошибка при обработке {file_path}: {str(e)}")]
+    seconds = time.perf_counter() - started
+    
+    if profiler:
+        digest = hashlib.blake2b(file_path.encode('utf-8'), digest_size=6).hexdigest()
+        os.makedirs(cprofile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(cprofile_dir, f"{Path(file_path).name}.{digest}.prof"))
+    
+    stats = {
+        'format': extension,
+        'size': size,
+        'parse_seconds': max(0.0, seconds - extractor.match_seconds),
+        'match_seconds': extractor.match_seconds,
+        'text_length': extractor.text_length,
+        'emails': sum(len(emails) for _, emails, _ in results if emails),
+    }
+    results = [(path, sorted(emails) if emails is not None else None, error)
+               for path, emails, error in results]
+    return (file_path, results, stats)
+
+
+# Пул процессов для разбора страниц PDF: (количество процессов, пул) или None.
+# Запуск процессов (spawn) стоит секунды, поэтому пул один на все файлы.
+_pdf_page_pool_state = None
+
+
+def _pdf_page_pool(workers):
+    """Получить общий пул процессов разбора страниц PDF, создав его при необходимости."""
+    global _pdf_page_pool_state
+    if _pdf_page_pool_state is None or _pdf_page_pool_state[0] != workers:
+        shutdown_pdf_page_pool()
+        pool = concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        _pdf_page_pool_state = (workers, pool)
+    return _pdf_page_pool_state[1]
+
+
+def shutdown_pdf_page_pool():
+    """Остановить общий пул процессов разбора страниц PDF."""
+    global _pdf_page_pool_state
+    if _pdf_page_pool_state is not None:
+        _shutdown_pool(_pdf_page_pool_state[1])
+        _pdf_page_pool_state = None
+
+
+def _extract_pdf_pages(file_path, pages):
+    """Разобрать указанные страницы PDF в дочернем процессе; вернуть найденные адреса."""
+    extractor = EmailExtractor()
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        fragments = (pdf_reader.pages[index].extract_text() for index in pages)
+        return sorted(extractor.extract_emails_from_fragments(fragments))
+
+
+def _init_worker(memory_limit=None):
+    """
+    Подготовить процесс пула: ограничить его адресное пространство.
+    
+    При нехватке памяти разбор файла завершается MemoryError, которая
+    попадает в ошибки этого файла, а не убивает весь запуск.
+    
+    Args:
+        memory_limit: Предел адресного пространства (байты) или None
+    """
+    if not memory_limit or not RESOURCE_AVAILABLE:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        memory_limit = min(memory_limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+
+
+def _shutdown_pool(pool):
+    """Остановить пул процессов без ожидания, отменив еще не начатые задачи."""
+    if sys.version_info >= (3, 9):
+        pool.shutdown(wait=False, cancel_futures=True)
+    else:
+        pool.shutdown(wait=False)
+
+
+def _terminate_pool(pool):
+    """Остановить пул процессов, не дожидаясь зависших задач."""
+    processes = list((getattr(pool, '_processes', None) or {}).values())
+    _shutdown_pool(pool)
+    # У ProcessPoolExecutor нет открытого способа прервать выполняемые задачи
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def _extract_chunk(file_paths, prefetch=None, **options):
+    """Обработать пачку файлов в дочернем процессе."""
+    return [
+        _extract_worker(file_path, source=source, **options)
+        for file_path, source in _iter_prefetched(file_paths, **(prefetch or {}))
+    ]
+
+
+class _PrefetchBudget:
+    """
+    Ограничение объема заранее прочитанных файлов.
+    
+    Место резервируется строго в порядке очереди файлов: файл, который
+    будет разобран раньше, никогда не ждет памяти, занятой более поздними.
+    """
+    
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.next_index = 0
+        self.closed = False
+        self.condition = threading.Condition()
+    
+    def reserve(self, index, size):
         """
-        Сохранить результаты в Excel файл.
+        Дождаться очереди и зарезервировать место под файл.
         
-        Args:
-            output_file: Путь к выходному файлу
+        Returns:
+            True, если место зарезервировано; False, если размер неизвестен (None),
+            файл больше предельного объема или чтение остановлено
         """
-        if not XLSX_AVAILABLE:
-            raise ImportError("openpyxl не установлен. Используйте CSV формат.")
-        
-        from openpyxl import Workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Найденные email"
-        
-        # Заголовки
-        ws.append(['Email адрес', 'Количество файлов', 'Файлы'])
+        with self.condition:
+            self.condition.wait_for(lambda: self.closed or self.next_index == index)
+            fits = size is not None and size <= self.limit
+            if fits:
+                self.condition.wait_for(lambda: self.closed or self.used + size <= self.limit)
+            self.next_index += 1
+            if self.closed or not fits:
+                self.condition.notify_all()
+                return False
+            self.used += size
+            self.condition.notify_all()
+            return True
+    
+    def release(self, size):
+        """Освободить место, занятое разобранным файлом."""
+        with self.condition:
+            self.used -= size
+            self.condition.notify_all()
+    
+    def close(self):
+        """Остановить ожидающие потоки чтения."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+def _prefetch_file(file_path, index, budget):
+    """
+    Прочитать файл в память в фоновом потоке.
+    
+    Returns:
+        Кортеж (поток BytesIO или None, зарезервированный объем); None означает,
+        что файл будет прочитан обработчиком формата обычным образом
+    """
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        size = None
+    # Резервировать нужно в любом случае, иначе очередь остановится
+    if not budget.reserve(index, size):
+        return None, 0
+    try:
+        with _open_path(file_path) as file:
+            buffer = io.BytesIO(file.read())
+    except OSError:
+        # Ошибку покажет обработчик формата, когда сам попробует открыть файл
+        budget.release(size)
+        return None, 0
+    buffer.name = str(file_path)
+    return buffer, size
+
+
+def _iter_prefetched(files, depth=0, memory_budget=256 * 1024 * 1024):
+    """
+    Выдавать файлы по порядку вместе с их содержимым, прочитанным заранее.
+    
+    Пока разбирается текущий файл, следующие depth файлов читаются в
+    фоновых потоках (ожидание сетевой файловой системы не простаивает
+    процессор), но суммарно не больше memory_budget байт.
+    
+    Args:
+        files: Список путей к файлам
+        depth: Сколько файлов читать заранее (0 — не читать)
+        memory_budget: Предельный объем прочитанных, но еще не разобранных данных
         
-        # Данные
-        for email, files in sorted(self.found_emails.items()):
-            files_str = '; '.join(files)
-            ws.append([email, len(files), files_str])
+    Yields:
+        Кортежи (путь, поток BytesIO или None)
+    """
+    if depth <= 0:
+        for file_path in files:
+            yield file_path, None
+        return
+    
+    budget = _PrefetchBudget(memory_budget)
+    pending = deque()
+    indexed = enumerate(files)
+    with ThreadPoolExecutor(max_workers=depth) as executor:
+        def submit_next():
+            for index, file_path in indexed:
+                pending.append((file_path, executor.submit(_prefetch_file, file_path, index, budget)))
+                return
         
-        # Автоматическая ширина столбцов
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
+        try:
+            for _ in range(depth):
+                submit_next()
+            while pending:
+                file_path, future = pending.popleft()
+                submit_next()
+                buffer, size = future.result()
                 try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 100)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        wb.save(output_file)
+                    yield file_path, buffer
+                finally:
+                    budget.release(size)
+        finally:
+            budget.close()
 
 
 class EmailExtractorGUI:
     """GUI приложение для извлечения email адресов."""
     
+    # Интервал обновления окна (мс) и максимум строк, добавляемых в результаты за одно обновление
+    FRAME_INTERVAL_MS = 50
+    MAX_LOG_LINES_PER_FRAME = 2000
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Извлечение email адресов из документов")
@@ -359,7 +3256,12 @@ class EmailExtractorGUI:
         self.extractor = None
         self.is_processing = False
         
+        # События от потока обработки; окно разбирает их в главном потоке через after()
+        self.events = queue.Queue()
+        self.pending_lines = deque()
+        
         self.setup_ui()
+        self.root.after(self.FRAME_INTERVAL_MS, self.drain_events)
     
     def setup_ui(self):
         """Настройка интерфейса."""
@@ -413,7 +3315,7 @@ class EmailExtractorGUI:
         )
         self.progress_label.pack(pady=5)
         
-        self.progress_bar = Progressbar(
+        self.progress_bar = ttk.Progressbar(
             self.root,
             length=650,
             mode='determinate'
@@ -464,22 +3366,81 @@ class EmailExtractorGUI:
             self.start_button.config(state="normal")
     
     def update_progress(self, current, total):
-        """Обновить прогресс-бар."""
-        if total > 0:
-            progress = (current / total) * 100
-            self.progress_bar['value'] = progress
-            self.progress_label.config(text=f"Обработано: {current} из {total} файлов ({progress:.1f}%)")
+        """Обновить прогресс-бар (можно вызывать из любого потока)."""
+        self.events.put(('progress', (current, total)))
     
     def update_status(self, message):
-        """Обновить статус."""
-        self.status_label.config(text=message)
-        self.root.update_idletasks()
+        """Обновить статус (можно вызывать из любого потока)."""
+        self.events.put(('status', message))
     
     def log_result(self, message):
-        """Добавить сообщение в область результатов."""
-        self.results_text.insert("end", message + "\n")
-        self.results_text.see("end")
-        self.root.update_idletasks()
+        """Добавить сообщение в область результатов (можно вызывать из любого потока)."""
+        self.events.put(('log', message.split("\n")))
+    
+    def log_lines(self, lines):
+        """Добавить несколько строк в область результатов одним событием."""
+        self.events.put(('log', list(lines)))
+    
+    def show_message(self, kind, title, message):
+        """Показать окно сообщения из главного потока."""
+        self.events.put(('message', (kind, title, message)))
+    
+    def drain_events(self):
+        """
+        Разобрать накопившиеся события и обновить окно (главный поток).
+        
+        Прогресс и статус схлопываются до последнего значения, строки
+        результатов добавляются одной вставкой не больше
+        MAX_LOG_LINES_PER_FRAME за раз.
+        """
+        progress = None
+        status = None
+        messages = []
+        finished = False
+        
+        while True:
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                progress = payload
+            elif kind == 'status':
+                status = payload
+            elif kind == 'log':
+                self.pending_lines.extend(payload)
+            elif kind == 'message':
+                messages.append(payload)
+            elif kind == 'finished':
+                finished = True
+        
+        if progress is not None:
+            current, total = progress
+            if total > 0:
+                percent = (current / total) * 100
+                self.progress_bar['value'] = percent
+                self.progress_label.config(text=f"Обработано: {current} из {total} файлов ({percent:.1f}%)")
+        if status is not None:
+            self.status_label.config(text=status)
+        
+        if self.pending_lines:
+            count = min(len(self.pending_lines), self.MAX_LOG_LINES_PER_FRAME)
+            lines = [self.pending_lines.popleft() for _ in range(count)]
+            self.results_text.insert("end", "\n".join(lines) + "\n")
+            self.results_text.see("end")
+        
+        for kind, title, message in messages:
+            if kind == 'error':
+                messagebox.showerror(title, message)
+            else:
+                messagebox.showinfo(title, message)
+        
+        if finished:
+            self.is_processing = False
+            self.select_button.config(state="normal")
+            self.start_button.config(state="normal")
+        
+        self.root.after(self.FRAME_INTERVAL_MS, self.drain_events)
     
     def start_processing(self):
         """Начать обработку файлов."""
@@ -492,17 +3453,41 @@ class EmailExtractorGUI:
         self.progress_bar['value'] = 0
         self.results_text.delete(1.0, "end")
         
+        # Журнал остается, только если прошлая обработка этой папки прервалась
+        resume = False
+        journal_file = self.journal_path()
+        if journal_file.exists() and journal_file.stat().st_size > 0:
+            resume = messagebox.askyesno(
+                "Прерванная обработка",
+                "Обработка этой папки была прервана.\n\n"
+                "Продолжить с места остановки? (Нет — начать заново)"
+            )
+        
         # Запускаем обработку в отдельном потоке
-        thread = Thread(target=self.process_files)
+        thread = Thread(target=self.process_files, args=(resume,))
         thread.daemon = True
         thread.start()
     
-    def process_files(self):
-        """Обработать файлы (выполняется в отдельном потоке)."""
+    def journal_path(self):
+        """Путь к журналу обработки выбранной папки."""
+        return Path(self.selected_directory) / "найденные_email.journal.ndjson"
+    
+    def process_files(self, resume=False):
+        """
+        Обработать файлы (выполняется в отдельном потоке).
+        
+        Args:
+            resume: Продолжить прерванную обработку по журналу
+        """
         try:
             self.extractor = EmailExtractor(
                 progress_callback=self.update_progress,
-                status_callback=self.update_status
+                status_callback=self.update_status,
+                workers=os.cpu_count() or 1,
+                cache_file=Path(self.selected_directory) / "найденные_email.cache.sqlite",
+                dedup=True,
+                journal_file=self.journal_path(),
+                resume=resume
             )
             
             self.log_result("=" * 60)
@@ -510,7 +3495,13 @@ class EmailExtractorGUI:
             self.log_result(f"Директория: {self.selected_directory}")
             self.log_result("=" * 60)
             
-            self.extractor.process_directory(self.selected_directory)
+            output_dir = Path(self.selected_directory)
+            csv_file = output_dir / "найденные_email.csv"
+            excel_file = output_dir / "найденные_email.xlsx"
+            profile_file = output_dir / "найденные_email.profile.json"
+            # Файлы, которые программа сама пишет в эту папку, не должны попадать в результаты
+            own_files = [csv_file, excel_file, profile_file, self.extractor.cache_file, self.extractor.journal_file]
+            self.extractor.process_directory(self.selected_directory, ignore_paths=own_files)
             
             # Выводим результаты
             self.log_result("\n" + "=" * 60)
@@ -518,6 +3509,11 @@ class EmailExtractorGUI:
             self.log_result("=" * 60)
             self.log_result(f"Всего обработано файлов: {self.extractor.processed_files}")
             self.log_result(f"Найдено уникальных email адресов: {len(self.extractor.found_emails)}")
+            self.log_result(f"Взято из кэша: {self.extractor.cache_hits}, обработано заново: {self.extractor.cache_misses}")
+            if self.extractor.journal_hits:
+                self.log_result(f"Взято из журнала прерванной обработки: {self.extractor.journal_hits}")
+            self.log_result(f"Пропущено копий одинаковых файлов: {self.extractor.duplicates_skipped} "
+                            f"({self.extractor.duplicate_bytes / 2**20:.1f} МБ)")
             
             if self.extractor.errors:
                 self.log_result(f"\nОшибок при обработке: {len(self.extractor.errors)}")
@@ -528,10 +3524,6 @@ class EmailExtractorGUI:
             
             # Сохраняем результаты
             if self.extractor.found_emails:
-                output_dir = Path(self.selected_directory)
-                csv_file = output_dir / "найденные_email.csv"
-                excel_file = output_dir / "найденные_email.xlsx"
-                
                 try:
                     self.extractor.save_to_csv(csv_file)
                     self.log_result(f"\nРезультаты сохранены в CSV: {csv_file}")
@@ -545,12 +3537,21 @@ class EmailExtractorGUI:
                 except Exception as e:
                     self.log_result(f"Ошибка при сохранении Excel: {str(e)}")
                 
+                try:
+                    self.extractor.profile.save(profile_file)
+                    self.log_result(f"Замеры времени сохранены: {profile_file}")
+                except Exception as e:
+                    self.log_result(f"Ошибка при сохранении замеров: {str(e)}")
+                
                 # Показываем список найденных email
                 self.log_result("\n" + "=" * 60)
                 self.log_result("НАЙДЕННЫЕ EMAIL АДРЕСА:")
                 self.log_result("=" * 60)
-                for email, files in sorted(self.extractor.found_emails.items()):
-                    self.log_result(f"{email} (найден в {len(files)} файле(ах))")
+                found_emails = self.extractor.found_emails
+                self.log_lines(
+                    f"{email} (найден в {found_emails.file_count(email)} файле(ах))"
+                    for email in sorted(found_emails)
+                )
             else:
                 self.log_result("\nEmail адреса не найдены.")
             
@@ -558,7 +3559,11 @@ class EmailExtractorGUI:
             self.log_result("Обработка завершена!")
             self.log_result("=" * 60)
             
-            messagebox.showinfo(
+            # Результаты сохранены, журнал для продолжения больше не нужен
+            self.journal_path().unlink(missing_ok=True)
+            
+            self.show_message(
+                'info',
                 "Завершено",
                 f"Обработка завершена!\n\n"
                 f"Обработано файлов: {self.extractor.processed_files}\n"
@@ -567,29 +3572,325 @@ class EmailExtractorGUI:
             )
         except Exception as e:
             self.log_result(f"\nКРИТИЧЕСКАЯ ОШИБКА: {str(e)}")
-            messagebox.showerror("Ошибка", f"Произошла ошибка: {str(e)}")
+            self.show_message('error', "Ошибка", f"Произошла ошибка: {str(e)}")
         finally:
-            self.is_processing = False
-            self.select_button.config(state="normal")
-            self.start_button.config(state="normal")
+            self.events.put(('finished', None))
 
 
-def main():
-    """Главная функция."""
+def write_ndjson_result(stream, file_path, emails, error):
+    """Записать результат обработки файла одной строкой JSON."""
+    record = {
+        'file': file_path,
+        'emails': sorted({email.lower() for email in emails or ()}),
+        'error': error,
+    }
+    stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+    stream.flush()
+
+
+def build_argument_parser():
+    """Параметры командной строки."""
+    parser = argparse.ArgumentParser(
+        description="Извлечение email адресов из документов. Без параметров запускается графический интерфейс."
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    
+    scan = subparsers.add_parser('scan', help="обработать папки без графического интерфейса")
+    scan.add_argument('directories', nargs='+', help="папки для поиска")
+    scan.add_argument('-f', '--format', choices=['ndjson', 'csv', 'xlsx', 'partial'], default='ndjson',
+                      help="формат вывода (ndjson — по строке на файл по мере обработки, "
+                           "partial — результаты части для команды merge)")
+    scan.add_argument('-o', '--output', help="файл результатов (для ndjson по умолчанию stdout)")
+    scan.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                      help="количество процессов")
+    scan.add_argument('--pdf-page-workers', type=int, default=1,
+                      help="процессов для разбора страниц одного PDF (при --workers 1)")
+    scan.add_argument('--prefetch', type=int, default=0, metavar='N',
+                      help="читать заранее в память N следующих файлов (для сетевых папок)")
+    scan.add_argument('--prefetch-memory', type=int, default=256, metavar='MB',
+                      help="предельный объем заранее прочитанных файлов, МБ (по умолчанию 256)")
+    scan.add_argument('--dedup', action='store_true',
+                      help="разбирать файлы с одинаковым содержимым один раз")
+    scan.add_argument('--journal', metavar='FILE',
+                      help="журнал обработанных файлов для продолжения после сбоя (NDJSON)")
+    scan.add_argument('--resume', action='store_true',
+                      help="продолжить прерванный запуск по журналу --journal")
+    scan.add_argument('--cache', help="файл кэша результатов (SQLite)")
+    scan.add_argument('--cache-hash', action='store_true',
+                      help="сверять содержимое файлов по хэшу")
+    scan.add_argument('--timeout', type=float,
+                      help="ограничение времени на один файл (секунды); в Windows действует только при -w 2 и больше")
+    scan.add_argument('--max-file-size', type=int, metavar='MB',
+                      help="не разбирать файлы больше указанного размера, МБ (они попадут в ошибки)")
+    scan.add_argument('--memory-budget', type=int, default=1024, metavar='MB',
+                      help="предельный суммарный размер файлов в обработке у процессов, МБ "
+                           "(по умолчанию 1024, 0 — без ограничения)")
+    scan.add_argument('--worker-memory', type=int, metavar='MB',
+                      help="ограничение памяти каждого процесса, МБ (только Linux/macOS)")
+    scan.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                      help="пропускать папки по шаблону (можно указать несколько раз)")
+    scan.add_argument('--shard', type=parse_shard, metavar='K/N',
+                      help="обработать только K-ю из N частей файлов (для запуска на нескольких узлах)")
+    scan.add_argument('--profile-report', metavar='FILE',
+                      help="сохранить замеры времени по форматам и самые медленные файлы в JSON")
+    scan.add_argument('--cprofile-dir', metavar='DIR',
+                      help="сохранять профиль cProfile для каждого обработанного файла")
+    scan.add_argument('--cprofile-format', action='append', metavar='EXT',
+                      help="профилировать только файлы с этим расширением, например .pdf")
+    scan.add_argument('-v', '--verbose', action='store_true', help="выводить статус в stderr")
+    
+    watch = subparsers.add_parser('watch', help="обработать папки и обновлять результаты при изменениях файлов")
+    watch.add_argument('directories', nargs='+', help="папки для слежения")
+    watch.add_argument('--csv', metavar='FILE', help="файл результатов CSV")
+    watch.add_argument('--xlsx', metavar='FILE', help="файл результатов Excel")
+    watch.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                       help="количество процессов для первой обработки")
+    watch.add_argument('--cache', help="файл кэша результатов (SQLite) для первой обработки")
+    watch.add_argument('--timeout', type=float,
+                       help="ограничение времени на один файл (секунды); в Windows действует только при -w 2 и больше")
+    watch.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                       help="пропускать папки по шаблону (можно указать несколько раз)")
+    watch.add_argument('--debounce', type=float, default=1.0,
+                       help="пауза без изменений перед обработкой, секунды (по умолчанию 1)")
+    watch.add_argument('--flush-interval', type=float, default=5.0,
+                       help="как часто сохранять результаты, секунды (по умолчанию 5)")
+    watch.add_argument('--polling', action='store_true', help="не использовать inotify, обходить папки (для подключенных сетевых папок)")
+    watch.add_argument('--poll-interval', type=float, default=2.0,
+                       help="интервал обхода папок без inotify, секунды (по умолчанию 2)")
+    watch.add_argument('-v', '--verbose', action='store_true', help="выводить статус в stderr")
+    
+    merge = subparsers.add_parser('merge', help="объединить результаты частей (scan --shard ... -f partial)")
+    merge.add_argument('partials', nargs='+', help="файлы результатов частей")
+    merge.add_argument('-f', '--format', choices=['csv', 'xlsx'], default='csv', help="формат вывода")
+    merge.add_argument('-o', '--output', help="файл результатов")
+    merge.add_argument('--allow-missing', action='store_true',
+                       help="сохранить результаты, даже если переданы не все части")
+    merge.add_argument('-v', '--verbose', action='store_true', help="выводить статус и ошибки в stderr")
+    return parser
+
+
+def parse_shard(value):
+    """
+    Разобрать номер части вида «K/N» (K от 1 до N).
+    
+    Returns:
+        Кортеж (номер части с нуля, количество частей)
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается K/N, например 1/4, а не {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"номер части должен быть от 1 до {count}")
+    return (index - 1, count)
+
+
+def run_scan(args):
+    """
+    Обработать папки из командной строки.
+    
+    Returns:
+        Код завершения процесса
+    """
+    if args.format in ('csv', 'xlsx') and not args.output:
+        args.output = f"найденные_email.{args.format}"
+    if args.format == 'partial' and not args.output:
+        args.output = (f"найденные_email.part{args.shard[0] + 1}of{args.shard[1]}.json.gz"
+                       if args.shard else "найденные_email.partial.json.gz")
+    
+    output = None
+    result_callback = None
+    if args.format == 'ndjson':
+        output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        result_callback = partial(write_ndjson_result, output)
+    
+    def print_status(message):
+        print(message, file=sys.stderr, flush=True)
+    
+    extractor = EmailExtractor(
+        status_callback=print_status if args.verbose else None,
+        workers=args.workers,
+        pdf_page_workers=args.pdf_page_workers,
+        prefetch=args.prefetch,
+        prefetch_memory=args.prefetch_memory * 1024 * 1024,
+        max_file_size=args.max_file_size * 1024 * 1024 if args.max_file_size else None,
+        memory_budget=args.memory_budget * 1024 * 1024 or None,
+        worker_memory_limit=args.worker_memory * 1024 * 1024 if args.worker_memory else None,
+        dedup=args.dedup,
+        journal_file=args.journal,
+        resume=args.resume,
+        shard=args.shard,
+        file_timeout=args.timeout,
+        cache_file=args.cache,
+        cache_hash=args.cache_hash,
+        result_callback=result_callback,
+        cprofile_dir=args.cprofile_dir,
+        cprofile_formats=[ext.lower() if ext.startswith('.') else f".{ext.lower()}"
+                          for ext in args.cprofile_format or []] or None
+    )
+    own_files = [path for path in (args.output, args.profile_report, args.cache, args.journal) if path]
+    if args.format == 'partial':
+        own_files.append(_temp_output_path(args.output))
+    try:
+        extractor.process_directory(args.directories, exclude_dirs=args.exclude, ignore_paths=own_files)
+    finally:
+        if output not in (None, sys.stdout):
+            output.close()
+    
+    if args.format == 'csv':
+        extractor.save_to_csv(args.output)
+    elif args.format == 'xlsx':
+        extractor.save_to_excel(args.output)
+    elif args.format == 'partial':
+        save_atomically(extractor.save_partial, args.output)
+    if args.profile_report:
+        extractor.profile.save(args.profile_report)
+    
+    summary = (f"Обработано файлов: {extractor.processed_files}, "
+               f"уникальных email: {len(extractor.found_emails)}, "
+               f"ошибок: {len(extractor.errors)}")
+    if args.cache:
+        summary += f", из кэша: {extractor.cache_hits}"
+    if args.dedup:
+        summary += (f", пропущено копий: {extractor.duplicates_skipped}"
+                    f" ({extractor.duplicate_bytes / 2**20:.1f} МБ)")
+    print(summary, file=sys.stderr)
+    if args.verbose:
+        for error in extractor.errors:
+            print(error, file=sys.stderr)
+    return 0
+
+
+def run_merge(args):
+    """
+    Объединить результаты частей в итоговый файл.
+    
+    Returns:
+        Код завершения процесса
+    """
+    if not args.output:
+        args.output = f"найденные_email.{args.format}"
+    
+    def print_status(message):
+        print(message, file=sys.stderr, flush=True)
+    
+    extractor = EmailExtractor(status_callback=print_status if args.verbose else None)
+    try:
+        missing = extractor.merge_partials(args.partials)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка объединения: {str(e)}", file=sys.stderr)
+        return 1
+    if missing and not args.allow_missing:
+        print(f"Переданы не все части, нет: {', '.join(str(index + 1) for index in missing)}. "
+              f"Чтобы сохранить неполные результаты, укажите --allow-missing", file=sys.stderr)
+        return 1
+    
+    if args.format == 'csv':
+        extractor.save_to_csv(args.output)
+    else:
+        extractor.save_to_excel(args.output)
+    
+    print(f"Обработано файлов: {extractor.processed_files}, "
+          f"уникальных email: {len(extractor.found_emails)}, "
+          f"ошибок: {len(extractor.errors)}", file=sys.stderr)
+    if args.verbose:
+        for error in extractor.errors:
+            print(error, file=sys.stderr)
+    return 0
+
+
+def _temp_output_path(output_file):
+    """Временный файл рядом с файлом результатов."""
+    output_file = Path(output_file)
+    return output_file.with_name(f".{output_file.stem}.tmp{output_file.suffix}")
+
+
+def save_atomically(save, output_file):
+    """
+    Сохранить файл результатов через временный файл, чтобы его никогда не видели недописанным.
+    
+    Args:
+        save: Функция сохранения (например, extractor.save_to_csv)
+        output_file: Путь к файлу результатов
+    """
+    temp_file = _temp_output_path(output_file)
+    save(temp_file)
+    os.replace(temp_file, output_file)
+
+
+def run_watch(args):
+    """
+    Обработать папки и следить за изменениями до Ctrl+C.
+    
+    Returns:
+        Код завершения процесса
+    """
+    if not args.csv and not args.xlsx:
+        args.csv = "найденные_email.csv"
+    
+    def print_status(message):
+        print(message, file=sys.stderr, flush=True)
+    
+    extractor = EmailExtractor(
+        status_callback=print_status if args.verbose else None,
+        workers=args.workers,
+        file_timeout=args.timeout,
+        cache_file=args.cache
+    )
+    
+    def flush():
+        if args.csv:
+            save_atomically(extractor.save_to_csv, args.csv)
+        if args.xlsx:
+            save_atomically(extractor.save_to_excel, args.xlsx)
+        print_status(f"Результаты сохранены, уникальных email: {len(extractor.found_emails)}")
+    
+    # Файлы результатов могут лежать в отслеживаемой папке: ни первая
+    # обработка, ни слежение не должны их разбирать
+    outputs = [path for path in (args.csv, args.xlsx) if path]
+    own_files = outputs + [_temp_output_path(path) for path in outputs]
+    if args.cache:
+        own_files.append(args.cache)
+    
+    extractor.process_directory(args.directories, exclude_dirs=args.exclude, ignore_paths=own_files)
+    flush()
+    # Дальше файлы обрабатываются по одному в этом процессе
+    extractor.workers = 1
+    extractor.cache_file = None
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    
+    # Службу останавливают сигналом SIGTERM: результаты сохраняются так же, как при Ctrl+C
+    signal.signal(signal.SIGTERM, stop)
+    
+    try:
+        extractor.watch(
+            args.directories,
+            exclude_dirs=args.exclude,
+            flush=flush,
+            ignore_paths=own_files,
+            debounce=args.debounce,
+            flush_interval=args.flush_interval,
+            polling=args.polling,
+            poll_interval=args.poll_interval
+        )
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run_gui():
+    """Запустить графический интерфейс."""
     # Проверяем доступность библиотек
     missing_libs = []
-    if not DOCX_AVAILABLE:
-        missing_libs.append("python-docx")
     if not XLSX_AVAILABLE:
         missing_libs.append("openpyxl")
     if not PDF_AVAILABLE:
-        missing_libs.append("PyPDF2")
-    if not PPTX_AVAILABLE:
-        missing_libs.append("python-pptx")
+        missing_libs.append("pypdf")
     if not XLS_AVAILABLE:
         missing_libs.append("xlrd")
     
-    root = Tk()
+    root = tk.Tk()
     app = EmailExtractorGUI(root)
     
     if missing_libs:
@@ -603,7 +3904,26 @@ def main():
     root.mainloop()
 
 
-if __name__ == "__main__":
-    main()
+def main(argv=None):
+    """Главная функция."""
+    parser = build_argument_parser()
+    args = parser.parse_args(argv)
+    
+    if args.command == 'scan':
+        if args.resume and not args.journal:
+            parser.error("--resume используется вместе с --journal")
+        return run_scan(args)
+    if args.command == 'watch':
+        return run_watch(args)
+    if args.command == 'merge':
+        return run_merge(args)
+    
+    if not TK_AVAILABLE:
+        parser.error("tkinter недоступен; используйте команду scan")
+    run_gui()
+    return 0
 
 
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -103,6 +103,14 @@ if %PYTHON_FOUND% == 0 (
 
 echo [OK] Найден Python: %PYTHON_CMD%
 %PYTHON_CMD% --version
+%PYTHON_CMD% -c "import sys; sys.exit(sys.version_info < (3, 8))"
+if %errorlevel% neq 0 (
+    echo [ОШИБКА] Нужен Python 3.8 или выше
+    echo Скачайте новую версию с https://www.python.org/downloads/
+    echo.
+    pause
+    exit /b 1
+)
 echo.
 
 REM Поиск pip
@@ -181,7 +189,7 @@ if %errorlevel% neq 0 (
     echo %PIP_CMD% install -r requirements.txt
     echo.
     echo Или установите каждую библиотеку отдельно:
-    echo %PIP_CMD% install python-docx openpyxl PyPDF2 python-pptx xlrd
+    echo %PIP_CMD% install openpyxl PyPDF2 xlrd
     echo.
     pause
     exit /b 1
@@ -29,7 +29,7 @@ if %errorlevel% == 0 (
 
 echo [ОШИБКА] Python не найден в системе!
 echo.
-echo Пожалуйста, установите Python 3.7 или выше:
+echo Пожалуйста, установите Python 3.8 или выше:
 echo 1. Скачайте с https://www.python.org/downloads/
 echo 2. При установке обязательно отметьте "Add Python to PATH"
 echo 3. После установки перезапустите этот файл
@@ -40,6 +40,14 @@ exit /b 1
 :found_python
 echo [OK] Найден Python: %PYTHON_CMD%
 %PYTHON_CMD% --version
+%PYTHON_CMD% -c "import sys; sys.exit(sys.version_info < (3, 8))"
+if %errorlevel% neq 0 (
+    echo [ОШИБКА] Нужен Python 3.8 или выше
+    echo Скачайте новую версию с https://www.python.org/downloads/
+    echo.
+    pause
+    exit /b 1
+)
 echo.
 
 REM Поиск pip